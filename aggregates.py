@@ -0,0 +1,29 @@
+import argparse
+import time
+
+from sqlalchemy import text
+
+from cache import invalidate
+from conf.db import add_profile_argument, apply_profile, session
+from conf.models import views_metadata
+
+
+def refresh_aggregates(concurrently=True):
+    """Recompute the score aggregate views. CONCURRENTLY does not block the reports that read them."""
+    for view in views_metadata.sorted_tables:
+        session.execute(text(f'REFRESH MATERIALIZED VIEW {"CONCURRENTLY " if concurrently else ""}{view.name}'))
+    session.commit()
+    invalidate(*(view.name for view in views_metadata.sorted_tables))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Refresh the materialized score aggregates')
+    parser.add_argument('--blocking', action='store_true',
+                        help='Refresh without CONCURRENTLY: faster, but locks the views for reading.')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+
+    start = time.perf_counter()
+    refresh_aggregates(concurrently=not argv.blocking)
+    print(f'Refreshed in {time.perf_counter() - start:.2f}s')
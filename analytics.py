@@ -0,0 +1,311 @@
+"""In-memory columnar analytics: the my_select reports over a NumPy snapshot of scores.
+
+The scores are read once, with the ids of their student, group, subject and teacher
+turned into array positions, and every report is answered with vectorized
+group-bys (np.bincount, lexsort) instead of a query. Needs numpy.
+    python analytics.py --check                  # every report against its SQL version
+    python analytics.py --save snapshot          # columnar files, memory-mapped by --load
+    python analytics.py --load snapshot --report 1 --report 12
+The snapshot is as fresh as the moment it was taken.
+"""
+import argparse
+import json
+import pathlib
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from conf.db import add_profile_argument, apply_profile, session
+from conf.models import Student, Group, Teacher, Score, Subject
+
+# Columns of the scores, one entry per score; student and subject are positions in the dimension arrays
+SCORE_COLUMNS = ['id', 'score', 'date', 'student', 'subject']
+
+
+def positions(ids, values):
+    """Positions of `values` in the sorted array `ids`, a ValueError if one of them is not there.
+
+    A score of a student or subject added after its table was read has no position.
+    """
+    values = np.asarray(values, dtype=ids.dtype)
+    found = np.searchsorted(ids, values)
+    missing = found == len(ids)
+    missing[~missing] = ids[found[~missing]] != values[~missing]
+    if missing.any():
+        raise ValueError(f'{missing.sum()} ids not in the table, e.g. {values[missing][0]}')
+    return found
+
+
+def averages(codes, weights, size):
+    """Per-code sum and count of `weights`, and the mean where the count is not zero."""
+    sums = np.bincount(codes, weights=weights, minlength=size)
+    counts = np.bincount(codes, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts, counts
+
+
+class Snapshot:
+    def __init__(self, scores, students, groups, subjects, teachers):
+        self.scores = scores
+        # Dimension tables: dicts of arrays, ordered by id
+        self.students = students
+        self.groups = groups
+        self.subjects = subjects
+        self.teachers = teachers
+        self.student_group = positions(groups['id'], students['group_id'])
+        self.subject_teacher = positions(teachers['id'], subjects['teacher_id'])
+        # Reports filter groups by name, and names are not unique
+        self.group_names, self.group_name_code = np.unique(groups['name'], return_inverse=True)
+
+    @classmethod
+    def from_database(cls, batch_size=100000):
+        def dimension(*columns):
+            rows = session.execute(select(*columns).order_by(columns[0])).all()
+            return {column.key: np.array([row[i] for row in rows], dtype=object if i else np.int64)
+                    for i, column in enumerate(columns)}
+
+        students = dimension(Student.id, Student.fullname, Student.group_id)
+        students['group_id'] = students['group_id'].astype(np.int64)
+        groups = dimension(Group.id, Group.name)
+        subjects = dimension(Subject.id, Subject.name, Subject.teacher_id)
+        subjects['teacher_id'] = subjects['teacher_id'].astype(np.int64)
+        teachers = dimension(Teacher.id, Teacher.fullname, Teacher.last_name)
+
+        chunks = []
+        result = session.execute(select(Score.id, Score.score, Score.date, Score.student_id, Score.subject_id),
+                                 execution_options={'yield_per': batch_size})
+        for rows in result.partitions():
+            ids, scores, dates, student_ids, subject_ids = zip(*rows)
+            chunks.append((np.array(ids, dtype=np.int64), np.array(scores, dtype=np.float64),
+                           np.array(dates, dtype='datetime64[D]'),
+                           positions(students['id'], student_ids).astype(np.int32),
+                           positions(subjects['id'], subject_ids).astype(np.int32)))
+        session.rollback()
+        if chunks:
+            columns = [np.concatenate(column) for column in zip(*chunks)]
+        else:
+            columns = [np.empty(0, dtype) for dtype in (np.int64, np.float64, 'datetime64[D]', np.int32, np.int32)]
+        return cls(dict(zip(SCORE_COLUMNS, columns)), students, groups, subjects, teachers)
+
+    def save(self, directory):
+        """One .npy file per score column, the dimension tables as JSON."""
+        directory = pathlib.Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, values in self.scores.items():
+            np.save(directory / f'{name}.npy', values)
+        dimensions = {name: {column: values.tolist() for column, values in table.items()}
+                      for name, table in self.dimensions().items()}
+        (directory / 'dimensions.json').write_text(json.dumps(dimensions, ensure_ascii=False), encoding='utf-8')
+
+    @classmethod
+    def load(cls, directory):
+        """A snapshot written by save(), with the score columns memory-mapped."""
+        directory = pathlib.Path(directory)
+        scores = {name: np.load(directory / f'{name}.npy', mmap_mode='r') for name in SCORE_COLUMNS}
+        dimensions = json.loads((directory / 'dimensions.json').read_text(encoding='utf-8'))
+        tables = {name: {column: np.array(values, dtype=np.int64 if column.endswith('id') else object)
+                         for column, values in table.items()}
+                  for name, table in dimensions.items()}
+        return cls(scores, **tables)
+
+    def dimensions(self):
+        return {'students': self.students, 'groups': self.groups, 'subjects': self.subjects,
+                'teachers': self.teachers}
+
+    # Score masks and per-score codes
+
+    def group_code(self, name):
+        position = np.searchsorted(self.group_names, name)
+        return position if position < len(self.group_names) and self.group_names[position] == name else -1
+
+    def subject_mask(self, subject):
+        return (self.subjects['name'] == subject)[self.scores['subject']]
+
+    def student_mask(self, student_fullname):
+        return (self.students['fullname'] == student_fullname)[self.scores['student']]
+
+    def teacher_mask(self, column, value):
+        teacher_subjects = (self.teachers[column] == value)[self.subject_teacher]
+        return teacher_subjects[self.scores['subject']]
+
+    def score_group_codes(self):
+        return self.group_name_code[self.student_group[self.scores['student']]]
+
+    def average(self, mask):
+        scores = self.scores['score'][mask]
+        return round(float(scores.mean()), 2) if len(scores) else None
+
+    def distinct_subjects(self, mask):
+        return [str(name) for name in self.subjects['name'][np.unique(self.scores['subject'][mask])]]
+
+    # The reports of my_select
+
+    def select_1(self):
+        means, counts = averages(self.scores['student'], self.scores['score'], len(self.students['id']))
+        present = np.flatnonzero(counts)
+        top = present[np.argsort(-means[present], kind='stable')[:5]]
+        return [(self.students['fullname'][i], round(float(means[i]), 2)) for i in top]
+
+    def select_2(self, subject):
+        mask = self.subject_mask(subject)
+        means, counts = averages(self.scores['student'][mask], self.scores['score'][mask], len(self.students['id']))
+        present = np.flatnonzero(counts)
+        if not len(present):
+            return None
+        best = present[np.argmax(means[present])]
+        return self.students['fullname'][best], round(float(means[best]), 2)
+
+    def select_3(self, subject):
+        mask = self.subject_mask(subject)
+        means, counts = averages(self.score_group_codes()[mask], self.scores['score'][mask], len(self.group_names))
+        return [(self.group_names[i], round(float(means[i]), 2)) for i in np.flatnonzero(counts)]
+
+    def select_4(self):
+        return self.average(slice(None))
+
+    def select_5(self, teacher):
+        return list(self.subjects['name'][(self.teachers['last_name'] == teacher)[self.subject_teacher]])
+
+    def select_6(self, group):
+        return list(self.students['fullname'][self.group_name_code[self.student_group] == self.group_code(group)])
+
+    def select_7(self, group, subject):
+        mask = self.subject_mask(subject) & (self.score_group_codes() == self.group_code(group))
+        return [(float(score), self.students['fullname'][student])
+                for score, student in zip(self.scores['score'][mask], self.scores['student'][mask])]
+
+    def select_8(self, teacher):
+        return self.average(self.teacher_mask('last_name', teacher))
+
+    def select_9(self, student_fullname):
+        return self.distinct_subjects(self.student_mask(student_fullname))
+
+    def select_10(self, student_fullname, teacher_fullname):
+        return self.distinct_subjects(self.student_mask(student_fullname)
+                                      & self.teacher_mask('fullname', teacher_fullname))
+
+    def select_11(self, student_fullname, teacher_fullname):
+        return self.average(self.student_mask(student_fullname) & self.teacher_mask('fullname', teacher_fullname))
+
+    def select_12(self, group, subject):
+        mask = np.flatnonzero(self.subject_mask(subject) & (self.score_group_codes() == self.group_code(group)))
+        student, date, ids = self.scores['student'][mask], self.scores['date'][mask], self.scores['id'][mask]
+        # By student, then latest date and id first; the first score of every student is the latest
+        order = np.lexsort((-ids, -date.astype(np.int64), student))
+        _, first = np.unique(student[order], return_index=True)
+        latest = mask[order[first]]
+        return [(float(self.scores['score'][i]), self.students['fullname'][self.scores['student'][i]])
+                for i in latest]
+
+
+def check_arguments(snapshot, limit):
+    """Arguments of every report, taken from the data: all subjects, groups and teachers, `limit` students."""
+    subjects = sorted(set(snapshot.subjects['name']))
+    groups = [str(name) for name in snapshot.group_names]
+    last_names = sorted(set(snapshot.teachers['last_name']))
+    teachers = sorted(set(snapshot.teachers['fullname']))
+    students = sorted(set(snapshot.students['fullname'][np.unique(snapshot.scores['student'])]))[:limit]
+    pairs = [(group, subject) for group in groups for subject in subjects]
+    return {
+        1: [()], 4: [()],
+        2: [(subject,) for subject in subjects],
+        3: [(subject,) for subject in subjects],
+        5: [(teacher,) for teacher in last_names],
+        6: [(group,) for group in groups],
+        7: pairs,
+        8: [(teacher,) for teacher in last_names],
+        9: [(student,) for student in students],
+        10: [(student, teacher) for student in students for teacher in teachers],
+        11: [(student, teacher) for student in students for teacher in teachers],
+        12: pairs,
+    }
+
+
+def normalize(result):
+    """Order-insensitive form of a report result, with plain Python values."""
+    if isinstance(result, list):
+        return sorted(normalize(item) for item in result)
+    if isinstance(result, tuple):
+        return tuple(normalize(item) for item in result)
+    if isinstance(result, (np.generic, np.ndarray)):
+        return result.item()
+    return result
+
+
+def close(a, b):
+    """Equal, but for averages: a mean halfway between two cents may round either way after a float sum."""
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= 0.01 + 1e-9
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(close(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def same(number, analytic, expected):
+    if close(normalize(analytic), normalize(expected)):
+        return True
+    # Students with the same average: any of them is a right answer for the top 5 and the best one
+    if number == 1:
+        return close([avg for _, avg in analytic], [avg for _, avg in expected])
+    if number == 2 and analytic and expected:
+        return close(analytic[1], expected[1])
+    return False
+
+
+def check(snapshot, limit):
+    """Run every report on the snapshot and in SQL, returns the number of different results."""
+    import cache
+    import my_select
+
+    cache.backend = None
+    failures = 0
+    for number, arguments in check_arguments(snapshot, limit).items():
+        report = getattr(my_select, f'select_{number}')
+        for args in arguments:
+            try:
+                expected = report(*args)
+            except TypeError:
+                # round(None) of the SQL version when nothing matches
+                session.rollback()
+                expected = None
+            analytic = getattr(snapshot, f'select_{number}')(*args)
+            if not same(number, analytic, expected):
+                failures += 1
+                print(f'select_{number}{args}: {analytic!r} != SQL {expected!r}')
+        print(f'select_{number}: {len(arguments)} calls checked')
+    session.rollback()
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='The my_select reports over an in-memory columnar snapshot')
+    parser.add_argument('--load', metavar='DIR', help='Memory-map a snapshot written by --save instead of querying.')
+    parser.add_argument('--save', metavar='DIR', help='Write the snapshot as columnar files.')
+    parser.add_argument('--check', action='store_true', help='Compare every report with its SQL version.')
+    parser.add_argument('--students', type=int, default=20, help='Students to check the per-student reports with.')
+    parser.add_argument('--report', type=int, action='append', choices=range(1, 13), metavar='N',
+                        help='Print a report with the sample arguments of my_select, can be repeated.')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+
+    start = time.perf_counter()
+    snapshot = Snapshot.load(argv.load) if argv.load else Snapshot.from_database()
+    print(f'{len(snapshot.scores["id"])} scores loaded in {time.perf_counter() - start:.2f}s')
+    if argv.save:
+        snapshot.save(argv.save)
+
+    if argv.report:
+        from my_select import REPORTS
+
+        for number in argv.report:
+            _, args, _ = REPORTS[number - 1]
+            start = time.perf_counter()
+            result = getattr(snapshot, f'select_{number}')(*args)
+            print(f'\n----------------------- func #: {number} ({(time.perf_counter() - start) * 1000:.2f} ms) '
+                  f'--------------------------\n')
+            print(result)
+
+    if argv.check and check(snapshot, argv.students):
+        raise SystemExit(1)
@@ -0,0 +1,61 @@
+"""Run the my_select reports concurrently on an AsyncEngine (asyncpg).
+
+Every report gets its own AsyncSession from the pool. The report functions are the
+synchronous ones of my_select, run through AsyncSession.run_sync with `session`
+bound to that session, so a full pass takes about as long as the slowest report.
+    python async_select.py --concurrency 6
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conf.db import add_profile_argument, apply_profile, get_async_engine, use_session
+from my_select import REPORTS
+
+
+def call_report(sync_session, report, args):
+    with use_session(sync_session):
+        return report(*args)
+
+
+async def run_reports(jobs, concurrency=5):
+    """Run (report, args) jobs with at most `concurrency` at a time.
+
+    Returns (result or exception, seconds) for every job, in the order of the jobs.
+    """
+    engine = get_async_engine()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(report, args):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with AsyncSession(engine) as async_session:
+                    result = await async_session.run_sync(call_report, report, args)
+            except Exception as e:
+                result = e
+            return result, time.perf_counter() - start
+
+    try:
+        return await asyncio.gather(*(run(report, args) for report, args in jobs))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run select_1 - select_12 concurrently')
+    parser.add_argument('--concurrency', type=int, default=5, help='Reports running at the same time.')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_reports([(report, args) for report, args, _ in REPORTS], argv.concurrency))
+    total = time.perf_counter() - start
+
+    for (report, args, _), (result, seconds) in zip(REPORTS, results):
+        print(f'\n----------------------- {report.__name__} ({seconds * 1000:.1f} ms) --------------------------\n')
+        print(result)
+    print(f'\nTotal: {total * 1000:.1f} ms, sum of reports: {sum(s for _, s in results) * 1000:.1f} ms')
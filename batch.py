@@ -0,0 +1,173 @@
+"""Batch mode of main.py (-a batch): many create / update / remove operations in one process.
+
+Operations are read from a JSONL or CSV file (or stdin), one per line, with the fields
+of the command line options: action, model, name, index, link_id, score, subject.
+They run in chunks of `chunk_size`, each chunk is one transaction. A failed operation
+is rolled back to its savepoint and reported, the rest of the batch goes on.
+Score creations of a chunk are resolved through the lookup index, preloaded with one
+query for the whole chunk, and inserted with a single executemany after the other
+operations of the chunk.
+"""
+import argparse
+import csv
+import datetime
+import itertools
+import json
+import sys
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+import crud
+from cache import invalidate
+from conf.db import session
+from conf.models import Score
+from lookup import lookup
+
+FIELDS = ['action', 'model', 'name', 'index', 'link_id', 'score', 'subject']
+CONVERTERS = {'index': int, 'link_id': int, 'score': float}
+
+
+def operation_func(op):
+    if op.action == 'create':
+        func = {
+            'Student': crud.create_person,
+            'Teacher': crud.create_person,
+            'Group': crud.create_group,
+            'Subject': crud.create_subject,
+        }.get(op.model)
+    else:
+        func = {'update': crud.update_row_by_id, 'remove': crud.remove_row_by_id}.get(op.action)
+    # Undecorated, so that errors are raised and do not roll back the whole chunk
+    return func.__wrapped__ if func else None
+
+
+def first_line(error):
+    return str(error).splitlines()[0] if str(error) else type(error).__name__
+
+
+def is_success(message):
+    return message == 'Successful!' or message.endswith(('is deleted.', 'is updated.'))
+
+
+def to_operation(record):
+    values = {}
+    for field in FIELDS:
+        value = record.get(field)
+        if value == '':
+            value = None
+        values[field] = CONVERTERS[field](value) if value is not None and field in CONVERTERS else value
+    return argparse.Namespace(**values)
+
+
+def parse_record(record):
+    """The operation of a parsed record, or an error message."""
+    if not isinstance(record, dict):
+        return f'Bad value: expected an object, not {type(record).__name__}'
+    try:
+        return to_operation(record)
+    except (TypeError, ValueError) as e:
+        return f'Bad value: {e}'
+
+
+def read_operations(stream):
+    """Yield (line number, operation or error message), the format is detected from the first non-blank line."""
+    lines = enumerate(stream, 1)
+    for number, first in lines:
+        if first.strip():
+            break
+    else:
+        return
+    if first.lstrip().startswith('{'):
+        for number, line in itertools.chain([(number, first)], lines):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, f'Cannot parse: {e}'
+                continue
+            yield number, parse_record(record)
+    else:
+        # line_num counts from the header, blank lines included
+        offset = number - 1
+        records = csv.DictReader(itertools.chain([first], (line for _, line in lines)))
+        for record in records:
+            yield offset + records.line_num, parse_record(record)
+
+
+def insert_scores(operations):
+    """Create the scores of a chunk, returns the errors as (line, message)."""
+    lookup.preload_students(ids=[op.index for _, op in operations if op.index],
+                            names=[op.name for _, op in operations if not op.index and op.name])
+
+    rows, lines, errors = [], [], []
+    today = datetime.date.today()
+    for line, op in operations:
+        student_id, error = lookup.student_id(op.index, op.name)
+        if not error:
+            subject_id, error = lookup.subject_id(op.subject)
+        if not error and op.score is None:
+            error = 'Score not provided for Score.'
+        if error:
+            errors.append((line, error))
+        else:
+            rows.append({'score': op.score, 'date': today, 'student_id': student_id, 'subject_id': subject_id})
+            lines.append(line)
+
+    if rows:
+        try:
+            with session.begin_nested():
+                session.execute(insert(Score), rows)
+            crud.batch_tables.add(Score.__tablename__)
+        except SQLAlchemyError as e:
+            errors.extend((line, f'Database error: {first_line(e)}') for line in lines)
+    return errors
+
+
+def run_chunk(chunk):
+    errors, scores = [], []
+    for line, op in chunk:
+        if isinstance(op, str):
+            errors.append((line, op))
+        elif op.action == 'create' and op.model == 'Score':
+            scores.append((line, op))
+        elif (func := operation_func(op)) is None:
+            errors.append((line, f'Unknown operation: {op.action} {op.model}'))
+        else:
+            try:
+                with session.begin_nested():
+                    message = func(op)
+            except Exception as e:
+                message = f'{type(e).__name__}: {first_line(e)}'
+            if not is_success(message):
+                errors.append((line, message))
+    errors.extend(insert_scores(scores))
+
+    try:
+        session.commit()
+    except SQLAlchemyError as e:
+        session.rollback()
+        return [(line, f'Chunk rolled back: {first_line(e)}') for line, _ in chunk]
+    invalidate(*crud.batch_tables)
+    crud.batch_tables.clear()
+    return sorted(errors)
+
+
+def run_batch(args):
+    stream = sys.stdin if args.file in (None, '-') else open(args.file, encoding='utf-8')
+    operations = read_operations(stream)
+    total = failed = 0
+    crud.batch_tables = set()
+    try:
+        while chunk := list(itertools.islice(operations, args.chunk_size)):
+            errors = run_chunk(chunk)
+            for line, message in errors:
+                print(f'line {line}: {message}')
+            total += len(chunk)
+            failed += len(errors)
+    finally:
+        crud.batch_tables = None
+        if stream is not sys.stdin:
+            stream.close()
+    return f'{total} operations, {total - failed} done, {failed} failed.'
@@ -0,0 +1,84 @@
+"""Throughput and latency of report_server under concurrent clients.
+
+    python report_server.py --quiet --no-cache &
+    python -m benchmarks.load_test --concurrency 8 --requests 2000
+
+Every client thread keeps one HTTP/1.1 connection open and cycles through the
+reports, with arguments found in the database of --profile (my_select.sample_values),
+which must be the one of the server. Without --no-cache the server answers most
+requests from its report cache, and the test measures the cache instead of the queries.
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from conf.db import add_profile_argument, apply_profile, remove_session
+from my_select import REPORTS, sample_arguments, sample_values
+
+
+def report_paths():
+    values = sample_values()
+    remove_session()
+    paths = []
+    for report, _, _ in REPORTS:
+        query = urlencode(sample_arguments(report, values))
+        paths.append(f'/{report.__name__}?{query}' if query else f'/{report.__name__}')
+    return paths
+
+
+def client(host, port, paths, count, offset, timings, errors):
+    connection = http.client.HTTPConnection(host, port)
+    try:
+        for i in range(count):
+            path = paths[(offset + i) % len(paths)]
+            start = time.perf_counter()
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status != 200:
+                errors.append(f'{response.status} {path}')
+    finally:
+        connection.close()
+
+
+def percentile(timings, p):
+    if not timings:
+        return float('nan')
+    return statistics.quantiles(timings, n=100, method='inclusive')[p - 1] if len(timings) > 1 else timings[0]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test of report_server')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Address of report_server.')
+    parser.add_argument('--concurrency', type=int, default=4, help='Client threads, one connection each.')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests in total.')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+
+    url = urlsplit(argv.url)
+    paths = report_paths()
+    timings, errors = [], []
+    per_client, rest = divmod(argv.requests, argv.concurrency)
+    threads = [threading.Thread(target=client,
+                                args=(url.hostname, url.port or 80, paths, per_client + (i < rest),
+                                      i * len(paths) // argv.concurrency, timings, errors))
+               for i in range(argv.concurrency)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(f'{len(timings)} requests, {argv.concurrency} clients, {elapsed:.2f} s')
+    print(f'{len(timings) / elapsed:.1f} req/s, '
+          f'p50 {percentile(timings, 50):.2f} ms, p99 {percentile(timings, 99):.2f} ms')
+    if errors:
+        print(f'{len(errors)} errors, first: {errors[0]}')
+        raise SystemExit(1)
@@ -0,0 +1,88 @@
+"""Memory and throughput of the ways to read many Score rows.
+
+    python -m benchmarks.rows --limit 1000000
+  orm_entities - session.query(Score): full instances in the identity map
+  orm_columns  - session.execute(select(columns)): ORM-enabled select of columns
+  core_rows    - crud.fetch_rows(): the same select on the Connection, Row objects (the list path of main.py)
+  core_tuples  - crud.fetch_rows() turned into plain tuples
+  core_stream  - crud.stream_rows(): batches of Rows from a server-side cursor, nothing kept
+Throughput is measured without tracing; memory is the tracemalloc peak of a second run
+while the rows are read and held.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from sqlalchemy import select
+
+from conf.db import add_profile_argument, apply_profile, session
+from conf.models import Score
+from crud import fetch_rows, stream_rows
+
+COLUMNS = [Score.id, Score.score, Score.date, Score.student_id, Score.subject_id]
+
+
+def orm_entities(limit):
+    return session.query(Score).order_by(Score.id).limit(limit).all()
+
+
+def orm_columns(limit):
+    return session.execute(select(*COLUMNS).order_by(Score.id).limit(limit)).all()
+
+
+def core_rows(limit):
+    return fetch_rows(select(*COLUMNS).order_by(Score.id).limit(limit))
+
+
+def core_tuples(limit):
+    return [tuple(row) for row in fetch_rows(select(*COLUMNS).order_by(Score.id).limit(limit))]
+
+
+def core_stream(limit):
+    count = 0
+    for rows in stream_rows(select(*COLUMNS).order_by(Score.id).limit(limit), 10000):
+        count += len(rows)
+    return count
+
+
+PATHS = [orm_entities, orm_columns, core_rows, core_tuples, core_stream]
+
+
+def measure(path, limit):
+    """Rows, seconds of a run and tracemalloc peak of a second run (tracing slows it down)."""
+    results = []
+    for traced in (False, True):
+        session.expunge_all()
+        gc.collect()
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = path(limit)
+        results.append(time.perf_counter() - start)
+        if traced:
+            results.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        count = result if isinstance(result, int) else len(result)
+        del result
+        session.rollback()
+    elapsed, _, peak = results
+    return count, elapsed, peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare ORM and Core reads of Score rows')
+    parser.add_argument('--limit', type=int, default=100000, help='Rows to read.')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+
+    # Connect and compile once before measuring
+    for path in PATHS:
+        path(1)
+        session.rollback()
+
+    for path in PATHS:
+        count, elapsed, peak = measure(path, argv.limit)
+        print(f'{path.__name__:13} {count:9} rows {elapsed:7.2f}s {count / elapsed:11,.0f} rows/s '
+              f'peak {peak / 2 ** 20:8.1f} MiB ({peak / max(count, 1):6.0f} B/row)')
@@ -0,0 +1,105 @@
+"""Correctness and latency of select_12 against its former max(date) implementation.
+
+For every group and subject of the database:
+  - select_12 must return, for every student, the score with the latest date
+    (the last entered of a day), as computed here in Python from the raw rows;
+  - the former query must return these rows too, plus its known extras: every
+    other score of the student on that day, in any subject.
+    python -m benchmarks.select_12 --repeat 5
+Exits with 1 when select_12 is wrong.
+"""
+import argparse
+import itertools
+import statistics
+import time
+from collections import Counter
+
+from sqlalchemy import and_, func, select
+
+import cache
+from conf.db import add_profile_argument, apply_profile, session
+from conf.models import Student, Group, Score, Subject
+from my_select import select_12
+
+# Compare queries, not the report cache
+cache.backend = None
+
+
+def select_12_max_date(group, subject):
+    """select_12 before the window function rewrite."""
+    scores_subquery = (session.query(Student.id, func.max(Score.date).label('max_date'))
+                       .join(Student, Student.id == Score.student_id)
+                       .join(Group, Group.id == Student.group_id)
+                       .join(Subject, Subject.id == Score.subject_id)
+                       .filter(and_(Group.name == group, Subject.name == subject))
+                       .group_by(Student.id)
+                       .subquery()
+                       )
+
+    score = (session.query(Score.score, Student.fullname)
+             .join(Student, Student.id == Score.student_id)
+             .join(scores_subquery, and_(scores_subquery.c.max_date == Score.date, Student.id == scores_subquery.c.id))
+             .all()
+             )
+
+    return [(s.score, s.fullname) for s in score]
+
+
+def expected(group, subject):
+    """Latest score of every student, from all the scores of the group in the subject."""
+    rows = session.execute(
+        select(Score.student_id, Score.date, Score.id, Score.score, Student.fullname)
+        .join(Student, Student.id == Score.student_id)
+        .join(Group, Group.id == Student.group_id)
+        .join(Subject, Subject.id == Score.subject_id)
+        .where(Group.name == group, Subject.name == subject)
+    ).all()
+    latest = {}
+    for row in rows:
+        current = latest.get(row.student_id)
+        if current is None or (row.date, row.id) > (current.date, current.id):
+            latest[row.student_id] = row
+    return [(row.score, row.fullname) for row in latest.values()]
+
+
+def median_ms(report, args, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        report(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check select_12 against the former implementation')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of each query for latency.')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+
+    groups = session.scalars(select(Group.name).distinct().order_by(Group.name)).all()
+    subjects = session.scalars(select(Subject.name).distinct().order_by(Subject.name)).all()
+    pairs = list(itertools.product(groups, subjects))
+    wrong, extras, timings = 0, 0, {'select_12': [], 'max_date': []}
+    for group, subject in pairs:
+        reference = Counter(expected(group, subject))
+        result = Counter(select_12(group, subject))
+        former = Counter(select_12_max_date(group, subject))
+        if result != reference:
+            wrong += 1
+            print(f'WRONG {group} / {subject}: missing {list(reference - result)}, extra {list(result - reference)}')
+        if reference - former:
+            print(f'{group} / {subject}: the former query misses {list(reference - former)}')
+        extras += sum((former - reference).values())
+        timings['select_12'].append(median_ms(select_12, (group, subject), argv.repeat))
+        timings['max_date'].append(median_ms(select_12_max_date, (group, subject), argv.repeat))
+    session.rollback()
+
+    print(f'{len(pairs)} group / subject pairs, select_12 wrong for {wrong}')
+    print(f'extra rows of the former query (same-day scores, other subjects): {extras}')
+    for name, values in timings.items():
+        if values:
+            print(f'{name:10} median {statistics.median(values):8.2f} ms, total {sum(values):9.1f} ms')
+    if wrong:
+        raise SystemExit(1)
@@ -0,0 +1,61 @@
+"""Query plans and latency of the my_select reports.
+
+Run it before and after `alembic upgrade head` and compare the output:
+    python -m benchmarks.select_plans --repeat 5 > before.txt
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import event
+
+import cache
+from conf.db import engine, session
+from my_select import REPORTS
+
+# Measure the database, not the report cache
+cache.backend = None
+
+
+def capture_statements(report, args):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        report(*args)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def explain(statement, parameters):
+    rows = session.connection().exec_driver_sql(f'EXPLAIN (ANALYZE, BUFFERS) {statement}', parameters).all()
+    return '\n'.join(row[0] for row in rows)
+
+
+def measure(report, args, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        report(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='EXPLAIN ANALYZE and latency of select_1 - select_12')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per report for latency.')
+    parser.add_argument('--no-plan', action='store_true', help='Only measure latency.')
+    argv = parser.parse_args()
+
+    for report, args, _ in REPORTS:
+        median, best = measure(report, args, argv.repeat)
+        print(f'\n----------------------- {report.__name__}{args} --------------------------')
+        print(f'median: {median:.2f} ms, min: {best:.2f} ms')
+        if not argv.no_plan:
+            for statement, parameters in capture_statements(report, args):
+                print(explain(statement, parameters))
+    session.rollback()
@@ -0,0 +1,62 @@
+"""Cold start time of the CLI.
+
+Every command runs in a fresh interpreter, as it does from cron:
+    python -m benchmarks.startup --runs 20
+    python -m benchmarks.startup --importtime "main.py --help"
+"""
+import argparse
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+# command, target median in ms; most of a database command is the SQLAlchemy import (~350 ms).
+# Read-only commands: the benchmark runs against the user's database.
+COMMANDS = [
+    ('main.py --help', 100),
+    ('main.py -a list -m Group --limit 1', 750),
+    ('main.py -a list -m Score --limit 1', 750),
+]
+
+
+def run(command, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *shlex.split(command)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+def importtime(command, top):
+    """The slowest imports of the command, by cumulative time."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', *shlex.split(command)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                rows.append((int(cumulative) / 1000, name.rstrip()))
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f'{cumulative:8.1f} ms {name}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the cold start of the CLI commands')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--importtime', metavar='COMMAND', help='Show the slowest imports of a command instead.')
+    parser.add_argument('--top', type=int, default=20)
+    argv = parser.parse_args()
+
+    if argv.importtime:
+        importtime(argv.importtime, argv.top)
+    else:
+        failed = False
+        for command, target in COMMANDS:
+            median, best = run(command, argv.runs)
+            failed |= median > target
+            print(f'{median:7.1f} ms median, {best:7.1f} ms min, target {target} ms  '
+                  f'{"OK  " if median <= target else "SLOW"} {command}')
+        raise SystemExit(1 if failed else 0)
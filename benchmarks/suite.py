@@ -0,0 +1,212 @@
+"""Benchmark suite: seeding throughput, the my_select reports and the main.py actions.
+
+Seeds a dataset of the given scale with the seeds/init.py generators, times every
+select_N and the create / list / update / remove actions in-process, and writes the
+results as JSON to compare between commits:
+
+    python -m benchmarks.suite --profile SQLITE_DB --scale 100k --output before.json
+    git checkout feature
+    python -m benchmarks.suite --profile SQLITE_DB --scale 100k --output after.json --compare before.json
+
+SQLite profiles get their tables from the models (create_all), PostgreSQL profiles must be
+migrated (alembic upgrade head); their tables are truncated before seeding, hence --yes.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+import sqlalchemy
+from sqlalchemy import func, select, text
+
+import cache
+from conf import db
+from conf.db import add_profile_argument, apply_profile, get_engine, session
+from conf.models import Base, Student, Group, Teacher, Score, Subject
+from my_select import REPORTS, sample_arguments, sample_values
+
+# Measure the database, not the report cache
+cache.backend = None
+
+# scale: students, scores per student; 10 groups and 5 teachers at every scale
+SCALES = {
+    '1k': (50, 20),
+    '100k': (1000, 100),
+    '10m': (50000, 200),
+}
+TABLES = [Group, Teacher, Subject, Student, Score]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def reset_tables():
+    if get_engine().dialect.name == 'postgresql':
+        names = ', '.join(model.__tablename__ for model in TABLES)
+        session.execute(text(f'TRUNCATE {names} RESTART IDENTITY CASCADE'))
+        session.commit()
+    else:
+        session.close()
+        Base.metadata.drop_all(get_engine())
+        Base.metadata.create_all(get_engine())
+
+
+def seed(scale, workers, batch_size, seed_value):
+    from seeds.init import SCORES_UNTIL, fake, seed_bulk
+
+    students, scores = SCALES[scale]
+    random.seed(seed_value)
+    fake.seed_instance(seed_value)
+    args = argparse.Namespace(
+        mode='copy' if get_engine().dialect.name == 'postgresql' else 'bulk',
+        groups=10, teachers=5, students=students, scores=scores, batch_size=batch_size,
+        workers=workers, seed=seed_value, parallel_write=False, until=SCORES_UNTIL,
+    )
+    start = time.perf_counter()
+    rates = seed_bulk(args)
+    rates['total_seconds'] = round(time.perf_counter() - start, 3)
+
+    if get_engine().dialect.name == 'postgresql':
+        from aggregates import refresh_aggregates
+        refresh_aggregates(concurrently=False)
+    session.execute(text('ANALYZE'))
+    session.commit()
+    return rates
+
+
+def row_counts():
+    return {model.__tablename__: session.scalar(select(func.count()).select_from(model)) for model in TABLES}
+
+
+def summary(timings):
+    return {'median_ms': round(statistics.median(timings), 3), 'min_ms': round(min(timings), 3)}
+
+
+def measure(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return summary(timings)
+
+
+def bench_reports(values, repeat):
+    results = {}
+    for report, _, _ in REPORTS:
+        kwargs = sample_arguments(report, values)
+        results[report.__name__] = measure(lambda: report(**kwargs), repeat)
+        session.rollback()
+    return results
+
+
+def bench_actions(values, repeat):
+    """The main.py actions on Score rows: every round creates a row, then updates and removes it."""
+    from crud import create_score, remove_row_by_id, show_list, update_row_by_id
+
+    def options(**kwargs):
+        defaults = dict(model='Score', name=None, index=None, link_id=None, score=None, subject=None,
+                        limit=None, after_id=None, stream=False, format='table', batch_size=1000)
+        return argparse.Namespace(**{**defaults, **kwargs})
+
+    create = options(index=values['student_id'], subject=values['subject'], score=4.0)
+    page = options(limit=100)
+    export = options(model='Student', format='csv')
+    timings = {'create': [], 'update': [], 'remove': [], 'list_page': [], 'list_export': []}
+
+    def timed(name, action, args):
+        start = time.perf_counter()
+        result = action(args)
+        timings[name].append((time.perf_counter() - start) * 1000)
+        return result
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            timed('create', create_score, create)
+            index = session.scalar(select(func.max(Score.id)))
+            timed('update', update_row_by_id, options(index=index, score=3.0))
+            timed('remove', remove_row_by_id, options(index=index))
+            timed('list_page', show_list, page)
+            timed('list_export', show_list, export)
+            session.rollback()
+
+    return {name: summary(runs) for name, runs in timings.items()}
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every median against an earlier run, returns the number of regressions."""
+    regressions = 0
+    for section in ('reports', 'actions'):
+        for name, current in results[section].items():
+            before = baseline.get(section, {}).get(name)
+            if not before:
+                continue
+            change = (current['median_ms'] - before['median_ms']) / before['median_ms'] * 100
+            slower = change > threshold
+            regressions += slower
+            print(f'{section:8} {name:12} {before["median_ms"]:10.2f} -> {current["median_ms"]:10.2f} ms '
+                  f'{change:+7.1f}% {"SLOWER" if slower else ""}')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Seed a dataset and time the reports and the CLI actions')
+    add_profile_argument(parser)
+    parser.add_argument('--scale', choices=list(SCALES), default='1k', help='Number of scores to seed.')
+    parser.add_argument('--no-seed', action='store_true', help='Benchmark the data already in the database.')
+    parser.add_argument('--yes', action='store_true', help='Allow truncating the tables of a PostgreSQL profile.')
+    parser.add_argument('--workers', type=int, default=0, help='Generate the dataset in N processes.')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generators, for the same data every run.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per report and per action.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--compare', metavar='JSON', help='Results of an earlier run to compare with.')
+    parser.add_argument('--threshold', type=float, default=10, help='Percent slower that counts as a regression.')
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+    if not argv.no_seed and get_engine().dialect.name != 'sqlite' and not argv.yes:
+        parser.error(f'seeding truncates the tables of the {db.profile} profile, confirm with --yes')
+
+    results = {
+        'commit': git_commit(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'profile': db.profile,
+        'dialect': get_engine().dialect.name,
+        'scale': None if argv.no_seed else argv.scale,
+    }
+    if not argv.no_seed:
+        reset_tables()
+        results['seed'] = seed(argv.scale, argv.workers, argv.batch_size, argv.seed)
+    results['rows'] = row_counts()
+    values = sample_values()
+    results['reports'] = bench_reports(values, argv.repeat)
+    results['actions'] = bench_actions(values, argv.repeat)
+    session.close()
+
+    for section in ('reports', 'actions'):
+        for name, timing in results[section].items():
+            print(f'{section:8} {name:12} {timing["median_ms"]:10.2f} ms median, {timing["min_ms"]:10.2f} ms min')
+    if argv.output:
+        with open(argv.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if argv.compare:
+        with open(argv.compare) as file:
+            baseline = json.load(file)
+        print(f'\nCompared with {baseline.get("commit")} ({baseline.get("dialect")}, {baseline.get("scale")}):')
+        if (baseline.get('dialect'), baseline.get('scale')) != (results['dialect'], results['scale']):
+            print('warning: the runs differ in database or scale')
+        if compare(results, baseline, argv.threshold):
+            raise SystemExit(1)
@@ -0,0 +1,154 @@
+"""Result cache for the my_select reports.
+
+Entries are keyed by the database profile, the function name and its arguments
+(positional or keyword, defaults filled in), expire after a TTL and are
+tagged with the tables the report reads, so that a write to a table drops them.
+Backends, chosen by the [CACHE] section of config.ini:
+    memory - in-process LRU (the default)
+    sqlite - a file shared by all CLI invocations on the host
+    none   - caching disabled
+"""
+import inspect
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from conf import db
+from conf.db import config
+
+stats = {'hits': 0, 'misses': 0}
+stats_lock = threading.Lock()
+
+
+class MemoryCache:
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, tables, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value, set(tables))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, tables):
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if entry[2] & set(tables)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SqliteCache:
+    def __init__(self, path, size):
+        self.size = size
+        # One connection shared by the threads of the process, serialized by the lock
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS entries '
+                                '(key TEXT PRIMARY KEY, expires REAL, value BLOB, used REAL)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS entry_tables (key TEXT, table_name TEXT)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS ix_entry_tables ON entry_tables (table_name)')
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute('SELECT expires, value FROM entries WHERE key = ? AND expires >= ?',
+                                          (key, time.time())).fetchone()
+            if row is None:
+                return None
+            self.connection.execute('UPDATE entries SET used = ? WHERE key = ?', (time.time(), key))
+        return row[0], pickle.loads(row[1])
+
+    def set(self, key, value, tables, ttl):
+        with self.lock, self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.execute('DELETE FROM entry_tables WHERE key = ?', (key,))
+            self.connection.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                    (key, time.time() + ttl, pickle.dumps(value), time.time()))
+            self.connection.executemany('INSERT INTO entry_tables VALUES (?, ?)', [(key, t) for t in tables])
+            # Expired entries, then the least recently used beyond the size, then the tables of both
+            self.connection.execute('DELETE FROM entries WHERE expires < ?', (time.time(),))
+            self.connection.execute('DELETE FROM entries WHERE key IN '
+                                    '(SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)', (self.size,))
+            self.connection.execute('DELETE FROM entry_tables WHERE key NOT IN (SELECT key FROM entries)')
+
+    def invalidate(self, tables):
+        marks = ', '.join('?' * len(tables))
+        with self.lock, self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.execute(f'DELETE FROM entries WHERE key IN '
+                                    f'(SELECT key FROM entry_tables WHERE table_name IN ({marks}))', tables)
+            self.connection.execute(f'DELETE FROM entry_tables WHERE table_name IN ({marks})', tables)
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute('DELETE FROM entries')
+            self.connection.execute('DELETE FROM entry_tables')
+
+
+def create_backend():
+    backend = config.get('CACHE', 'BACKEND', fallback='memory')
+    size = config.getint('CACHE', 'SIZE', fallback=1024)
+    if backend == 'memory':
+        return MemoryCache(size)
+    if backend == 'sqlite':
+        return SqliteCache(config.get('CACHE', 'PATH', fallback='reports_cache.sqlite'), size)
+    return None
+
+
+backend = create_backend()
+TTL = config.getint('CACHE', 'TTL', fallback=300)
+
+
+def cached(*tables, ttl=None):
+    """Cache the result of a report that reads the given tables."""
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if backend is None:
+                return func(*args, **kwargs)
+            # select_2('X') and select_2(subject='X') are one entry; the SQLite file is shared by every profile
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            key = f'{db.profile}:{func.__module__}.{func.__qualname__}:{sorted(arguments.arguments.items())!r}'
+            entry = backend.get(key)
+            with stats_lock:
+                stats['hits' if entry is not None else 'misses'] += 1
+            if entry is not None:
+                return entry[1]
+            value = func(*args, **kwargs)
+            backend.set(key, value, tables, TTL if ttl is None else ttl)
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidate(*tables):
+    if backend is not None and tables:
+        backend.invalidate(list(tables))
+
+
+def clear():
+    if backend is not None:
+        backend.clear()
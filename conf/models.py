@@ -1,6 +1,5 @@
-from sqlalchemy import Column, Integer, String, Double
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Double, Numeric, Index, Computed, MetaData, Table
+from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy.sql.sqltypes import Date
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -17,16 +16,32 @@ class Student(Base):
     group_id = Column(Integer, ForeignKey('groups.id'), nullable=False)
     scores = relationship('Score', backref='students')
 
+    __table_args__ = (
+        Index('ix_students_group_id', 'group_id'),
+        Index('ix_students_fullname', 'fullname'),
+    )
+
+    # Stored generated column, so that filters on fullname can use an index
+    _fullname = Column('fullname', String(301), Computed("first_name || ' ' || last_name", persisted=True))
+
     @hybrid_property
     def fullname(self):
         return self.first_name + ' ' + self.last_name
 
+    @fullname.expression
+    def fullname(cls):
+        return cls._fullname
+
 
 class Group(Base):
     __tablename__ = 'groups'
     id = Column(Integer, primary_key=True)
     name = Column(String(150), nullable=False)
 
+    __table_args__ = (
+        Index('ix_groups_name', 'name'),
+    )
+
 
 class Teacher(Base):
     __tablename__ = 'teachers'
@@ -35,10 +50,22 @@ class Teacher(Base):
     last_name = Column(String(150), nullable=False)
     subjects = relationship('Subject', back_populates='teachers')
 
+    __table_args__ = (
+        Index('ix_teachers_last_name', 'last_name'),
+        Index('ix_teachers_fullname', 'fullname'),
+    )
+
+    # Stored generated column, so that filters on fullname can use an index
+    _fullname = Column('fullname', String(301), Computed("first_name || ' ' || last_name", persisted=True))
+
     @hybrid_property
     def fullname(self):
         return self.first_name + ' ' + self.last_name
 
+    @fullname.expression
+    def fullname(cls):
+        return cls._fullname
+
 
 class Subject(Base):
     __tablename__ = 'subjects'
@@ -47,7 +74,18 @@ class Subject(Base):
     teacher_id = Column(Integer, ForeignKey('teachers.id'), nullable=False)
     teachers = relationship('Teacher', back_populates='subjects')
 
+    __table_args__ = (
+        Index('ix_subjects_name', 'name'),
+        Index('ix_subjects_teacher_id', 'teacher_id'),
+    )
+
+
+# Grade scale of Score.score, from the best grade down
+SCORES = [4.0, 3.7, 3.3, 3.0, 2.7, 2.3, 2.0, 1.7, 1.3, 1.0, 0.0]
 
+
+# On PostgreSQL scores is partitioned by date, one partition per semester, with (id, date) as
+# primary key (migration b7f2a0c86d14, partitions.py); ids still come from one sequence
 class Score(Base):
     __tablename__ = 'scores'
     id = Column(Integer, primary_key=True)
@@ -55,3 +93,63 @@ class Score(Base):
     date = Column(Date, nullable=False)
     student_id = Column(Integer, ForeignKey('students.id'), nullable=False)
     subject_id = Column(Integer, ForeignKey('subjects.id'), nullable=False)
+
+    __table_args__ = (
+        # Covers the "scores of a subject per student" reports (select_2, select_3, select_7)
+        Index('ix_scores_subject_student_score', 'subject_id', 'student_id', 'score'),
+        # Covers the per-student reports (select_1, select_9 - select_11)
+        Index('ix_scores_student_subject_date', 'student_id', 'subject_id', 'date'),
+        # Latest score of every student in a subject, in index order (select_12)
+        Index('ix_scores_subject_student_date_desc', 'subject_id', 'student_id', date.desc()),
+    )
+
+
+# Running score totals, kept current by the triggers of migration 7a3e9b1c4d28 (see rollups.py)
+class StudentScoreRollup(Base):
+    __tablename__ = 'student_score_rollups'
+    student_id = Column(Integer, ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    score_sum = Column(Numeric, nullable=False, server_default='0')
+    score_count = Column(BigInteger, nullable=False, server_default='0')
+
+
+class SubjectScoreRollup(Base):
+    __tablename__ = 'subject_score_rollups'
+    subject_id = Column(Integer, ForeignKey('subjects.id', ondelete='CASCADE'), primary_key=True)
+    score_sum = Column(Numeric, nullable=False, server_default='0')
+    score_count = Column(BigInteger, nullable=False, server_default='0')
+
+
+class GroupScoreRollup(Base):
+    __tablename__ = 'group_score_rollups'
+    group_id = Column(Integer, ForeignKey('groups.id', ondelete='CASCADE'), primary_key=True)
+    score_sum = Column(Numeric, nullable=False, server_default='0')
+    score_count = Column(BigInteger, nullable=False, server_default='0')
+
+
+# Materialized views with score aggregates (migration 2f8a6c3d5e90). They live in their own
+# MetaData, so that create_all() and autogenerate do not treat them as tables.
+views_metadata = MetaData()
+
+student_subject_scores = Table(
+    'mv_student_subject_scores', views_metadata,
+    Column('student_id', Integer, primary_key=True),
+    Column('subject_id', Integer, primary_key=True),
+    Column('group_id', Integer),
+    Column('score_sum', Double),
+    Column('score_count', BigInteger),
+)
+
+group_subject_scores = Table(
+    'mv_group_subject_scores', views_metadata,
+    Column('group_id', Integer, primary_key=True),
+    Column('subject_id', Integer, primary_key=True),
+    Column('score_sum', Double),
+    Column('score_count', BigInteger),
+)
+
+teacher_scores = Table(
+    'mv_teacher_scores', views_metadata,
+    Column('teacher_id', Integer, primary_key=True),
+    Column('score_sum', Double),
+    Column('score_count', BigInteger),
+)
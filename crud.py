@@ -0,0 +1,176 @@
+import datetime
+
+from sqlalchemy import select, update, delete
+
+from cache import invalidate
+from conf.db import session
+from conf.models import Student, Group, Teacher, Score, Subject
+from error_decorator import db_error_decorator
+from lookup import lookup
+from output import write_rows
+
+model_dict = {
+    'Student': [Student, ['id', 'fullname', 'group_id']],
+    'Group': [Group, ['id', 'name']],
+    'Teacher': [Teacher, ['id', 'fullname']],
+    'Score': [Score, ['id', 'score', 'date', 'student_id', 'subject_id']],
+    'Subject': [Subject, ['id', 'name', 'teacher_id']],
+}
+
+
+# Tables written since the last commit while batch.py runs operations, None outside of a batch
+batch_tables = None
+
+
+def commit(model):
+    """Commit and drop the cached reports that read the model's table.
+
+    In a batch only flush, batch.py commits every chunk.
+    """
+    if model in (Student, Subject):
+        lookup.refresh()
+    if batch_tables is not None:
+        session.flush()
+        batch_tables.add(model.__tablename__)
+        return
+    session.commit()
+    invalidate(model.__tablename__)
+
+
+@db_error_decorator
+def create_person(args):
+    model, *_ = model_dict[args.model]
+    first_name, last_name = args.name.split(' ')
+    kwargs = {'first_name': first_name, 'last_name': last_name}
+    if args.model == 'Student':
+        kwargs['group_id'] = args.link_id
+
+    person = model(**kwargs)
+    session.add(person)
+    commit(model)
+    return "Successful!"
+
+
+@db_error_decorator
+def create_group(args):
+    group = session.query(Group.name).filter(Group.name == args.name).all()
+    if group:
+        return "Already Exists!"
+    group = Group(
+        name=args.name)
+    session.add(group)
+    commit(Group)
+    return "Successful!"
+
+
+@db_error_decorator
+def create_subject(args):
+    subject = Subject(
+        name=args.name,
+        teacher_id=args.link_id)
+    session.add(subject)
+    commit(Subject)
+    return "Successful!"
+
+
+@db_error_decorator
+def create_score(args):
+    student_id, error = lookup.student_id(args.index, args.name)
+    if error:
+        return error
+    subject_id, error = lookup.subject_id(args.subject)
+    if error:
+        return error
+    score = Score(
+        score=args.score,
+        date=datetime.date.today(),
+        student_id=student_id,
+        subject_id=subject_id
+    )
+    session.add(score)
+    commit(Score)
+    return "Successful!"
+
+
+def fetch_rows(stmt):
+    """Rows of a select run on the session's Connection: Core Row tuples, no entities, no identity map."""
+    return session.connection().execute(stmt).all()
+
+
+def stream_rows(stmt, batch_size):
+    """Batches of rows of a select, fetched from a server-side cursor."""
+    result = session.connection().execute(stmt, execution_options={'yield_per': batch_size})
+    yield from result.partitions()
+
+
+def list_statement(args):
+    """Column-only select of the model, paginated by id (keyset pagination)."""
+    model, columns = model_dict[args.model]
+    stmt = select(*[getattr(model, column) for column in columns]).order_by(model.id)
+    if args.after_id is not None:
+        stmt = stmt.where(model.id > args.after_id)
+    if args.limit is not None:
+        stmt = stmt.limit(args.limit)
+    return stmt
+
+
+@db_error_decorator
+def show_list(args):
+    _, columns = model_dict[args.model]
+    stmt = list_statement(args)
+    fmt = 'text' if args.stream and args.format == 'table' else args.format
+
+    if fmt == 'table':
+        rows = fetch_rows(stmt)
+        write_rows(columns, [rows], fmt)
+        if args.limit is not None and len(rows) == args.limit:
+            return f'Next page: --after_id {rows[-1].id}'
+        return None
+
+    # Server-side cursor, rows are fetched and written batch by batch
+    write_rows(columns, stream_rows(stmt, args.batch_size), fmt)
+    return None
+
+
+@db_error_decorator
+def remove_row_by_id(args):
+    model, *_ = model_dict[args.model]
+    # One DELETE by primary key, without loading the row and its relationships
+    result = session.execute(delete(model).where(model.id == args.index))
+    if not result.rowcount:
+        return "No such row"
+    commit(model)
+    return f'Row {args.index} in {args.model} is deleted.'
+
+
+@db_error_decorator
+def update_row_by_id(args):
+    model, *_ = model_dict[args.model]
+    if args.model == 'Score':
+        if not args.score:
+            return f"Score not provided for {args.model}."
+        values = {'score': args.score}
+
+    elif args.model == 'Subject' and args.link_id:
+        values = {'teacher_id': args.link_id}
+
+    elif args.model in ['Subject', 'Group']:
+        if not args.name:
+            return f"Name not provided for {args.model}."
+        values = {'name': args.name}
+
+    elif args.model == 'Student' and args.link_id:
+        values = {'group_id': args.link_id}
+
+    elif args.model in ['Student', 'Teacher']:
+        if not args.name:
+            return f"Name not provided for {args.model}."
+        first_name, last_name = args.name.split(' ')
+        values = {'first_name': first_name, 'last_name': last_name}
+
+    # One UPDATE by primary key, without loading the row
+    result = session.execute(update(model).where(model.id == args.index).values(**values))
+    if not result.rowcount:
+        return "No such row"
+    commit(model)
+    return f'Row {args.index} in {args.model} is updated.'
@@ -0,0 +1,163 @@
+"""Statement timings and slow-query log for every engine of conf.db.
+
+Enabled by the [INSTRUMENTATION] section of config.ini, or for one run with
+SQL_INSTRUMENT=1:
+    SQL_INSTRUMENT=1 python my_select.py
+Every statement is timed between before_cursor_execute and after_cursor_execute,
+with its row count and the line of the project that ran it. Statements are recorded
+as SQLAlchemy compiled them, also when PREPARED_STATEMENTS (statements.py) sends an
+EXECUTE of a prepared statement instead. The row count is cursor.rowcount: the rows
+of a SELECT with psycopg2, but -1 (counted as 0) for SELECTs on SQLite. Statements slower than
+SLOW_MS are logged (with EXPLAIN (ANALYZE, BUFFERS) of slow SELECTs when EXPLAIN is on),
+and the TOP statements by total time are printed to stderr at exit.
+"""
+import atexit
+import datetime
+import functools
+import pathlib
+import re
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+
+from conf.db import config
+
+HERE = pathlib.Path(__file__).resolve()
+ROOT = HERE.parent
+SLOW_MS = config.getfloat('INSTRUMENTATION', 'SLOW_MS', fallback=100)
+EXPLAIN = config.getboolean('INSTRUMENTATION', 'EXPLAIN', fallback=False)
+TOP = config.getint('INSTRUMENTATION', 'TOP', fallback=10)
+LOG = config.get('INSTRUMENTATION', 'LOG', fallback='')
+
+# (statement, call site): [calls, total ms, max ms, rows]
+stats = {}
+stats_lock = threading.Lock()
+log_lock = threading.Lock()
+_engines = set()
+
+
+@functools.lru_cache(maxsize=None)
+def project_path(filename):
+    """Path of a source file relative to the project, None for this module, libraries and the standard library."""
+    path = pathlib.Path(filename).resolve()
+    if path == HERE or ROOT not in path.parents or 'site-packages' in path.parts:
+        return None
+    return path.relative_to(ROOT)
+
+
+def call_site():
+    """file:line of the innermost frame of the project that led to the statement."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = project_path(frame.f_code.co_filename)
+        if path is not None:
+            return f'{path}:{frame.f_lineno} {frame.f_code.co_name}'
+        frame = frame.f_back
+    return '?'
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = (time.perf_counter() - conn.info['query_start'].pop()) * 1000
+    rows = cursor.rowcount if cursor.rowcount >= 0 else 0
+    # The statement before the hooks that rewrite it, e.g. an EXECUTE of statements.py
+    if context is not None and context.statement:
+        statement = context.statement
+    statement = re.sub(r'\s+', ' ', statement).strip()
+    site = call_site()
+    with stats_lock:
+        entry = stats.setdefault((statement, site), [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+        entry[3] += rows
+
+    if elapsed >= SLOW_MS:
+        plan = None
+        if (EXPLAIN and not executemany and conn.dialect.name == 'postgresql'
+                and statement.upper().startswith(('SELECT', 'WITH'))):
+            plan = explain(conn, statement, parameters)
+        log_slow(elapsed, rows, site, statement, parameters, plan)
+
+
+def handle_error(context):
+    # after_cursor_execute is not called for a failed statement
+    if context.connection is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+
+def explain(conn, statement, parameters):
+    """EXPLAIN (ANALYZE, BUFFERS) on the same connection.
+
+    It runs in a savepoint, so that a failed EXPLAIN leaves the transaction usable.
+    """
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute('SAVEPOINT instrumentation_explain')
+        try:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {statement}', parameters)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        except Exception as e:
+            cursor.execute('ROLLBACK TO SAVEPOINT instrumentation_explain')
+            plan = f'EXPLAIN failed: {e}'.strip()
+        cursor.execute('RELEASE SAVEPOINT instrumentation_explain')
+        return plan
+    finally:
+        cursor.close()
+
+
+def log_slow(elapsed, rows, site, statement, parameters, plan):
+    lines = [f'{datetime.datetime.now().isoformat(timespec="milliseconds")} slow query: {elapsed:.1f} ms, '
+             f'{rows} rows, {site}',
+             f'    {statement}',
+             f'    parameters: {parameters!r}']
+    if plan:
+        lines.extend(f'    {line}' for line in plan.splitlines())
+    with log_lock:
+        if LOG:
+            with open(LOG, 'a', encoding='utf-8') as file:
+                file.write('\n'.join(lines) + '\n')
+        else:
+            print('\n'.join(lines), file=sys.stderr)
+
+
+def install(engine):
+    """Time the statements of the engine (an AsyncEngine is instrumented through its sync_engine)."""
+    engine = getattr(engine, 'sync_engine', engine)
+    if engine in _engines:
+        return
+    _engines.add(engine)
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(engine, 'handle_error', handle_error)
+    if TOP and len(_engines) == 1:
+        atexit.register(print_summary, TOP)
+
+
+def summary(top=TOP):
+    """(statement, call site, calls, total ms, max ms, rows) of the `top` statements by total time."""
+    with stats_lock:
+        rows = [(statement, site, *entry) for (statement, site), entry in stats.items()]
+    return sorted(rows, key=lambda row: row[3], reverse=True)[:top]
+
+
+def print_summary(top=TOP):
+    rows = summary(top)
+    if not rows:
+        return
+    print(f'\nSQL statements by total time (top {len(rows)} of {len(stats)}):', file=sys.stderr)
+    print(f'{"total ms":>10} {"calls":>6} {"mean ms":>9} {"max ms":>9} {"rows":>8}  call site / statement',
+          file=sys.stderr)
+    for statement, site, calls, total, longest, count in rows:
+        print(f'{total:10.1f} {calls:6} {total / calls:9.2f} {longest:9.2f} {count:8}  {site}\n'
+              f'{"":47}{statement[:120]}{"..." if len(statement) > 120 else ""}', file=sys.stderr)
+
+
+def reset():
+    with stats_lock:
+        stats.clear()
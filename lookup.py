@@ -0,0 +1,77 @@
+"""In-memory name -> id index for score creation.
+
+Students are loaded on demand, only the ids and fullnames that are asked for, with one
+query per call of `preload_students` (a batch chunk preloads all of its keys at once).
+Keys that were not found are remembered as missing too, until the next refresh.
+Subjects are few, they are all loaded on the first lookup and reloaded on a miss.
+Names shared by several rows are reported as ambiguous instead of taking the first one.
+"""
+from collections import defaultdict
+
+from sqlalchemy import select
+
+from conf.db import session
+from conf.models import Student, Subject
+
+
+class Lookup:
+    def __init__(self):
+        self.student_ids = set()
+        self.students_by_name = {}
+        self.missing_ids = set()
+        self.missing_subjects = set()
+        self.subjects_by_name = None
+
+    def refresh(self):
+        """Forget everything, the next lookups read the database again."""
+        self.__init__()
+
+    def preload_students(self, ids=(), names=()):
+        unknown_ids = set(ids) - self.student_ids - self.missing_ids
+        if unknown_ids:
+            found = set(session.scalars(select(Student.id).where(Student.id.in_(unknown_ids))))
+            self.student_ids.update(found)
+            self.missing_ids.update(unknown_ids - found)
+
+        unknown_names = set(names) - self.students_by_name.keys()
+        if unknown_names:
+            found = {name: [] for name in unknown_names}
+            rows = session.execute(select(Student.fullname, Student.id).where(Student.fullname.in_(unknown_names)))
+            for name, student_id in rows:
+                found[name].append(student_id)
+            self.students_by_name.update(found)
+
+    def load_subjects(self):
+        self.subjects_by_name = defaultdict(list)
+        for name, subject_id in session.execute(select(Subject.name, Subject.id)):
+            self.subjects_by_name[name].append(subject_id)
+
+    def student_id(self, index=None, name=None):
+        """Returns (id, None) or (None, error message)."""
+        if index:
+            self.preload_students(ids=[index])
+            return (index, None) if index in self.student_ids else (None, 'Student Not Found!')
+        if not name:
+            return None, 'Student Not Found!'
+        self.preload_students(names=[name])
+        return self.single(self.students_by_name.get(name), 'Student', name)
+
+    def subject_id(self, name):
+        """Returns (id, None) or (None, error message)."""
+        if self.subjects_by_name is None or (name not in self.subjects_by_name
+                                             and name not in self.missing_subjects):
+            self.load_subjects()
+            if name not in self.subjects_by_name:
+                self.missing_subjects.add(name)
+        return self.single(self.subjects_by_name.get(name), 'Subject', name)
+
+    @staticmethod
+    def single(ids, model, name):
+        if not ids:
+            return None, f'{model} Not Found!'
+        if len(ids) > 1:
+            return None, f'{model} name "{name}" is ambiguous (ids {", ".join(map(str, sorted(ids)))}).'
+        return ids[0], None
+
+
+lookup = Lookup()
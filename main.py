@@ -1,147 +1,12 @@
-import argparse
-import random
-import datetime
-
-from sqlalchemy import and_, func, desc
-from prettytable import PrettyTable
-
-from conf.db import session
-from conf.models import Student, Group, Teacher, Score, Subject
-from error_decorator import db_error_decorator
-
-table = PrettyTable()
-
-model_dict = {
-    'Student': [Student, ['id', 'fullname', 'group_id']],
-    'Group': [Group, ['id', 'name']],
-    'Teacher': [Teacher, ['id', 'fullname']],
-    'Score': [Score, ['id', 'score', 'date', 'student_id', 'subject_id']],
-    'Subject': [Subject, ['id', 'name', 'teacher_id']],
-}
-
-
-@db_error_decorator
-def create_person(args):
-    model, *_ = model_dict[args.model]
-    first_name, last_name = args.name.split(' ')
-    kwargs = {'first_name': first_name, 'last_name': last_name}
-    if args.model == 'Student':
-        kwargs['group_id'] = args.link_id
-
-    person = model(**kwargs)
-    session.add(person)
-    session.commit()
-    return "Successful!"
-
-
-@db_error_decorator
-def create_group(args):
-    group = session.query(Group.name).filter(Group.name == args.name).all()
-    if group:
-        return "Already Exists!"
-    group = Group(
-        name=args.name)
-    session.add(group)
-    session.commit()
-    return "Successful!"
-
-
-@db_error_decorator
-def create_subject(args):
-    subject = Subject(
-        name=args.name,
-        teacher_id=args.link_id)
-    session.add(subject)
-    session.commit()
-    return "Successful!"
-
-
-@db_error_decorator
-def create_score(args):
-    student = None
-    if args.index:
-        student = (session.query(Student.id).filter(Student.id == args.index).first())
-    elif args.name:
-        first_name, last_name = args.name.split(' ')
-        student = (session.query(Student.id)
-                   .filter(and_(Student.first_name == first_name, Student.last_name == last_name))
-                   .first())
-    subject = (session.query(Subject.id).filter(Subject.name == args.subject).first())
-    if not student:
-        return "Student Not Found!"
-    elif not subject:
-        return "Subject Not Found!"
-    score = Score(
-        score=args.score,
-        date=datetime.date.today(),
-        student_id=student.id,
-        subject_id=subject.id
-    )
-    session.add(score)
-    session.commit()
-    return "Successful!"
-
-
-@db_error_decorator
-def show_list(args):
-    model, columns = model_dict[args.model]
-    result = session.query(model).all()
-    table.field_names = columns
-    all_rows = []
-
-    for obj in result:
-        filed = []
-        for column in columns:
-            filed.append(getattr(obj, column))
-        all_rows.append(filed)
-
-    table.add_rows(all_rows)
-    return table.get_string()
-
-
-@db_error_decorator
-def remove_row_by_id(args):
-    model, *_ = model_dict[args.model]
-    result = session.query(model).filter(model.id == args.index).scalar()
-    if not result:
-        return "No such row"
-    session.delete(result)
-    session.commit()
-    return f'Row {args.index} in {args.model} is deleted.'
-
-
-@db_error_decorator
-def update_row_by_id(args):
-    model, *_ = model_dict[args.model]
-    result = session.query(model).filter(model.id == args.index).scalar()
-    if not result:
-        return "No such row"
+"""Command line entry point, the operations themselves are in crud.py.
 
-    if args.model == 'Score':
-        if not args.score:
-            return f"Score not provided for {args.model}."
-        result.score = args.score
-
-    elif args.model == 'Subject' and args.link_id:
-        result.teacher_id = args.link_id
-
-    elif args.model in ['Subject', 'Group']:
-        if not args.name:
-            return f"Name not provided for {args.model}."
-        result.name = args.name
-
-    elif args.model == 'Student' and args.link_id:
-        result.group_id = args.link_id
-
-    elif args.model in ['Student', 'Teacher']:
-        if not args.name:
-            return f"Name not provided for {args.model}."
-        first_name, last_name = args.name.split(' ')
-        result.first_name = first_name
-        result.last_name = last_name
+Only argparse and the config of conf.db are imported up front, so that --help and
+usage errors do not pay for SQLAlchemy. Check the startup time with `python -m benchmarks.startup`.
+"""
+import argparse
 
-    session.commit()
-    return f'Row {args.index} in {args.model} is updated.'
+from conf.db import add_profile_argument, apply_profile
+from output import FORMATS
 
 
 if __name__ == '__main__':
@@ -174,21 +39,29 @@ if __name__ == '__main__':
                '12. Update a subject name by ID:\n'
                '    python main.py -a update -m Subject -id 5 --name "Advanced Psychology"\n\n'
                '13. Update a group name by ID:\n'
-               '    python main.py -a update -m Group -id 3 --name "Group B"\n',
+               '    python main.py -a update -m Group -id 3 --name "Group B"\n\n'
+               '14. List scores page by page (100 rows after ID 500):\n'
+               '    python main.py -a list -m Score --limit 100 --after_id 500\n\n'
+               '15. Stream all scores without loading them into memory:\n'
+               '    python main.py -a list -m Score --stream\n\n'
+               '16. Export all scores as CSV:\n'
+               '    python main.py -a list -m Score --format csv > scores.csv\n\n'
+               '17. Run many operations from a JSONL or CSV file, one transaction per 1000 rows:\n'
+               '    python main.py -a batch --file scores.jsonl --chunk_size 1000\n'
+               '    {"action": "create", "model": "Score", "name": "John Doe", "subject": "Art", "score": 4.0}\n',
         formatter_class=argparse.RawTextHelpFormatter
     )
 
     parser.add_argument('-a', '--action',
                         type=str,
-                        help='• Options: create / update / list / remove.',
+                        help='• Options: create / update / list / remove / batch.',
                         metavar='',
                         required=True)
 
     parser.add_argument('-m', '--model',
                         type=str,
                         help='• Choose a model: Student / Group / Teacher / Score / Subject.',
-                        metavar='',
-                        required=True)
+                        metavar='')
 
     parser.add_argument('-n', '--name',
                         type=str,
@@ -215,7 +88,60 @@ if __name__ == '__main__':
                         help='• To show subjects options use: "python main.py -a list -m Subject".',
                         metavar='')
 
+    parser.add_argument('--limit',
+                        type=int,
+                        help='• List: maximum number of rows.',
+                        metavar='')
+
+    parser.add_argument('--after_id',
+                        type=int,
+                        help='• List: show rows with ID greater than this one (next page).',
+                        metavar='')
+
+    parser.add_argument('--stream',
+                        action='store_true',
+                        help='• List: write rows as they are fetched, using a server-side cursor.')
+
+    parser.add_argument('--format',
+                        type=str,
+                        choices=FORMATS,
+                        default='table',
+                        help='• List: output format, all but "table" are streamed: ' + ' / '.join(FORMATS) + '.',
+                        metavar='')
+
+    parser.add_argument('--batch_size',
+                        type=int,
+                        default=1000,
+                        help='• List: rows fetched per round trip when streaming.',
+                        metavar='')
+
+    parser.add_argument('--file',
+                        type=str,
+                        help='• Batch: JSONL or CSV file with operations, stdin when omitted or "-".',
+                        metavar='')
+
+    parser.add_argument('--chunk_size',
+                        type=int,
+                        default=1000,
+                        help='• Batch: operations per transaction.',
+                        metavar='')
+
+    add_profile_argument(parser,
+                         type=str,
+                         help='• Section of config.ini to connect with: DEV_DB (default) / PROD_DB.',
+                         metavar='')
+
     argv = parser.parse_args()
+    if argv.action != 'batch' and not argv.model:
+        parser.exit(2, 'main.py: error: the following arguments are required: -m/--model\n')
+    if argv.limit is not None and argv.limit < 1:
+        parser.exit(2, 'main.py: error: --limit must be at least 1\n')
+    # Without the usage line, like the --model check above
+    apply_profile(parser, argv, error=lambda message: parser.exit(2, f'main.py: error: {message}\n'))
+
+    # SQLAlchemy, the models and the engine are loaded only once the arguments are valid
+    from crud import (create_person, create_group, create_subject, create_score,
+                      show_list, remove_row_by_id, update_row_by_id)
 
     if argv.action == 'create' and argv.model in ['Student', 'Teacher']:
         print(create_person(argv))
@@ -227,10 +153,16 @@ if __name__ == '__main__':
         print(create_subject(argv))  # -a create -m Subject --name 'G777' (Вчитель назначається випадково)
 
     elif argv.action == 'list':
-        print(show_list(argv))
+        output = show_list(argv)
+        if output is not None:
+            print(output)
 
     elif argv.action == 'remove':
         print(remove_row_by_id(argv))
 
     elif argv.action == 'update':
         print(update_row_by_id(argv))
+
+    elif argv.action == 'batch':
+        from batch import run_batch
+        print(run_batch(argv))
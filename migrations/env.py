@@ -6,7 +6,7 @@ from sqlalchemy import pool
 from alembic import context
 
 from conf.models import Base
-from conf.db import URI
+from conf.db import get_uri
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -27,7 +27,7 @@ target_metadata = Base.metadata
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
-config.set_main_option("sqlalchemy.url", URI)
+config.set_main_option("sqlalchemy.url", get_uri())
 
 
 def run_migrations_offline() -> None:
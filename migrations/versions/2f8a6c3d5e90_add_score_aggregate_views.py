@@ -0,0 +1,54 @@
+"""Add score aggregate materialized views
+
+Revision ID: 2f8a6c3d5e90
+Revises: 9c4d1e7f2b36
+Create Date: 2026-10-18 14:05:51.230874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f8a6c3d5e90'
+down_revision: Union[str, None] = '9c4d1e7f2b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_student_subject_scores AS
+        SELECT scores.student_id, scores.subject_id, students.group_id,
+               sum(scores.score) AS score_sum, count(*) AS score_count
+        FROM scores JOIN students ON students.id = scores.student_id
+        GROUP BY scores.student_id, scores.subject_id, students.group_id
+    """)
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_group_subject_scores AS
+        SELECT students.group_id, scores.subject_id,
+               sum(scores.score) AS score_sum, count(*) AS score_count
+        FROM scores JOIN students ON students.id = scores.student_id
+        GROUP BY students.group_id, scores.subject_id
+    """)
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_teacher_scores AS
+        SELECT subjects.teacher_id, sum(scores.score) AS score_sum, count(*) AS score_count
+        FROM scores JOIN subjects ON subjects.id = scores.subject_id
+        GROUP BY subjects.teacher_id
+    """)
+    # Unique indexes are required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index('ux_mv_student_subject_scores', 'mv_student_subject_scores',
+                    ['student_id', 'subject_id'], unique=True)
+    op.create_index('ix_mv_student_subject_scores_subject', 'mv_student_subject_scores',
+                    ['subject_id', 'student_id', 'score_sum', 'score_count'], unique=False)
+    op.create_index('ux_mv_group_subject_scores', 'mv_group_subject_scores', ['group_id', 'subject_id'], unique=True)
+    op.create_index('ux_mv_teacher_scores', 'mv_teacher_scores', ['teacher_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.execute('DROP MATERIALIZED VIEW mv_teacher_scores')
+    op.execute('DROP MATERIALIZED VIEW mv_group_subject_scores')
+    op.execute('DROP MATERIALIZED VIEW mv_student_subject_scores')
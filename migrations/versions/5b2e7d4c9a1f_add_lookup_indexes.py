@@ -0,0 +1,38 @@
+"""Add foreign-key and lookup indexes
+
+Revision ID: 5b2e7d4c9a1f
+Revises: 848b83132669
+Create Date: 2026-10-18 10:12:03.418522
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e7d4c9a1f'
+down_revision: Union[str, None] = '848b83132669'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_groups_name', 'groups', ['name'], unique=False)
+    op.create_index('ix_teachers_last_name', 'teachers', ['last_name'], unique=False)
+    op.create_index('ix_students_group_id', 'students', ['group_id'], unique=False)
+    op.create_index('ix_subjects_name', 'subjects', ['name'], unique=False)
+    op.create_index('ix_subjects_teacher_id', 'subjects', ['teacher_id'], unique=False)
+    op.create_index('ix_scores_subject_student_score', 'scores', ['subject_id', 'student_id', 'score'], unique=False)
+    op.create_index('ix_scores_student_subject_date', 'scores', ['student_id', 'subject_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scores_student_subject_date', table_name='scores')
+    op.drop_index('ix_scores_subject_student_score', table_name='scores')
+    op.drop_index('ix_subjects_teacher_id', table_name='subjects')
+    op.drop_index('ix_subjects_name', table_name='subjects')
+    op.drop_index('ix_students_group_id', table_name='students')
+    op.drop_index('ix_teachers_last_name', table_name='teachers')
+    op.drop_index('ix_groups_name', table_name='groups')
@@ -0,0 +1,133 @@
+"""Add incrementally maintained score rollups
+
+Revision ID: 7a3e9b1c4d28
+Revises: 2f8a6c3d5e90
+Create Date: 2026-10-18 15:32:10.648102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3e9b1c4d28'
+down_revision: Union[str, None] = '2f8a6c3d5e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Score changes of one statement as (student_id, subject_id, score, count) deltas,
+# read from the transition tables of a statement-level trigger.
+DELTAS = {
+    'INSERT': 'SELECT student_id, subject_id, score::numeric AS score, 1 AS cnt FROM new_rows',
+    'DELETE': 'SELECT student_id, subject_id, -score::numeric AS score, -1 AS cnt FROM old_rows',
+}
+DELTAS['UPDATE'] = f"{DELTAS['INSERT']} UNION ALL {DELTAS['DELETE']}"
+TRANSITIONS = {
+    'INSERT': 'NEW TABLE AS new_rows',
+    'DELETE': 'OLD TABLE AS old_rows',
+    'UPDATE': 'NEW TABLE AS new_rows OLD TABLE AS old_rows',
+}
+
+APPLY_DELTAS = """
+    WITH deltas AS ({deltas}),
+    by_student AS (
+        INSERT INTO student_score_rollups AS r (student_id, score_sum, score_count)
+        SELECT student_id, sum(score), sum(cnt) FROM deltas GROUP BY student_id
+        ON CONFLICT (student_id) DO UPDATE
+        SET score_sum = r.score_sum + excluded.score_sum, score_count = r.score_count + excluded.score_count
+    ),
+    by_subject AS (
+        INSERT INTO subject_score_rollups AS r (subject_id, score_sum, score_count)
+        SELECT subject_id, sum(score), sum(cnt) FROM deltas GROUP BY subject_id
+        ON CONFLICT (subject_id) DO UPDATE
+        SET score_sum = r.score_sum + excluded.score_sum, score_count = r.score_count + excluded.score_count
+    )
+    INSERT INTO group_score_rollups AS r (group_id, score_sum, score_count)
+    SELECT students.group_id, sum(deltas.score), sum(deltas.cnt)
+    FROM deltas JOIN students ON students.id = deltas.student_id
+    GROUP BY students.group_id
+    ON CONFLICT (group_id) DO UPDATE
+    SET score_sum = r.score_sum + excluded.score_sum, score_count = r.score_count + excluded.score_count;
+"""
+
+# A student moving to another group takes their totals along
+MOVE_STUDENT = """
+    UPDATE group_score_rollups AS r
+    SET score_sum = r.score_sum - s.score_sum, score_count = r.score_count - s.score_count
+    FROM student_score_rollups AS s
+    WHERE s.student_id = NEW.id AND r.group_id = OLD.group_id;
+
+    INSERT INTO group_score_rollups AS r (group_id, score_sum, score_count)
+    SELECT NEW.group_id, s.score_sum, s.score_count FROM student_score_rollups AS s WHERE s.student_id = NEW.id
+    ON CONFLICT (group_id) DO UPDATE
+    SET score_sum = r.score_sum + excluded.score_sum, score_count = r.score_count + excluded.score_count;
+"""
+
+BACKFILL = """
+    INSERT INTO student_score_rollups (student_id, score_sum, score_count)
+    SELECT student_id, sum(score::numeric), count(*) FROM scores GROUP BY student_id;
+
+    INSERT INTO subject_score_rollups (subject_id, score_sum, score_count)
+    SELECT subject_id, sum(score::numeric), count(*) FROM scores GROUP BY subject_id;
+
+    INSERT INTO group_score_rollups (group_id, score_sum, score_count)
+    SELECT students.group_id, sum(scores.score::numeric), count(*)
+    FROM scores JOIN students ON students.id = scores.student_id GROUP BY students.group_id;
+"""
+
+
+def rollup_table(name, key, target):
+    op.create_table(name,
+    sa.Column(key, sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Numeric(), server_default='0', nullable=False),
+    sa.Column('score_count', sa.BigInteger(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint([key], [target], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint(key)
+    )
+
+
+def upgrade() -> None:
+    rollup_table('student_score_rollups', 'student_id', 'students.id')
+    rollup_table('subject_score_rollups', 'subject_id', 'subjects.id')
+    rollup_table('group_score_rollups', 'group_id', 'groups.id')
+    op.execute(BACKFILL)
+
+    for operation, deltas in DELTAS.items():
+        function = f'scores_rollups_{operation.lower()}'
+        op.execute(f"""
+            CREATE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                {APPLY_DELTAS.format(deltas=deltas)}
+                RETURN NULL;
+            END $$
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {function} AFTER {operation} ON scores
+            REFERENCING {TRANSITIONS[operation]} FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+        """)
+
+    op.execute(f"""
+        CREATE FUNCTION students_rollups_move() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            {MOVE_STUDENT}
+            RETURN NULL;
+        END $$
+    """)
+    op.execute("""
+        CREATE TRIGGER students_rollups_move AFTER UPDATE OF group_id ON students
+        FOR EACH ROW WHEN (OLD.group_id IS DISTINCT FROM NEW.group_id) EXECUTE FUNCTION students_rollups_move()
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER students_rollups_move ON students')
+    op.execute('DROP FUNCTION students_rollups_move()')
+    for operation in DELTAS:
+        function = f'scores_rollups_{operation.lower()}'
+        op.execute(f'DROP TRIGGER {function} ON scores')
+        op.execute(f'DROP FUNCTION {function}()')
+    op.drop_table('group_score_rollups')
+    op.drop_table('subject_score_rollups')
+    op.drop_table('student_score_rollups')
@@ -0,0 +1,31 @@
+"""Add stored fullname columns
+
+Revision ID: 9c4d1e7f2b36
+Revises: 5b2e7d4c9a1f
+Create Date: 2026-10-18 11:40:27.905316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4d1e7f2b36'
+down_revision: Union[str, None] = '5b2e7d4c9a1f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('students', 'teachers'):
+        op.add_column(table, sa.Column('fullname', sa.String(length=301),
+                                       sa.Computed("first_name || ' ' || last_name", persisted=True)))
+        op.create_index(f'ix_{table}_fullname', table, ['fullname'], unique=False)
+
+
+def downgrade() -> None:
+    for table in ('students', 'teachers'):
+        op.drop_index(f'ix_{table}_fullname', table_name=table)
+        op.drop_column(table, 'fullname')
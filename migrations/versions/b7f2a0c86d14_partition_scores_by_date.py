@@ -0,0 +1,107 @@
+"""Partition scores by date, one partition per semester
+
+Revision ID: b7f2a0c86d14
+Revises: e41b7c9d2a53
+Create Date: 2026-10-18 19:26:37.915840
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f2a0c86d14'
+down_revision: Union[str, None] = 'e41b7c9d2a53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('scores_id_seq'::regclass),
+    score double precision NOT NULL,
+    date date NOT NULL,
+    student_id integer NOT NULL REFERENCES students (id),
+    subject_id integer NOT NULL REFERENCES subjects (id)
+"""
+
+
+def semester_start(day):
+    """Autumn semesters start on September 1, spring semesters on February 1 (as in partitions.py)."""
+    if day.month >= 9:
+        return datetime.date(day.year, 9, 1)
+    if day.month >= 2:
+        return datetime.date(day.year, 2, 1)
+    return datetime.date(day.year - 1, 9, 1)
+
+
+def next_semester(start):
+    return datetime.date(start.year, 9, 1) if start.month == 2 else datetime.date(start.year + 1, 2, 1)
+
+
+def dependents():
+    """Definitions of the indexes, triggers and materialized views built on scores, to recreate them."""
+    bind = op.get_bind()
+    indexes = bind.execute(sa.text(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = 'scores' "
+        "AND indexname <> 'scores_pkey'")).scalars().all()
+    triggers = bind.execute(sa.text(
+        "SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = 'scores'::regclass AND NOT tgisinternal"
+    )).scalars().all()
+    views = bind.execute(sa.text(
+        "SELECT DISTINCT v.relname, pg_get_viewdef(v.oid) FROM pg_depend d "
+        "JOIN pg_rewrite r ON r.oid = d.objid JOIN pg_class v ON v.oid = r.ev_class "
+        "WHERE d.refobjid = 'scores'::regclass AND v.relkind = 'm'")).all()
+    view_indexes = bind.execute(sa.text(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = ANY(:views)"),
+        {'views': [name for name, _ in views]}).scalars().all()
+    return indexes, triggers, views, view_indexes
+
+
+def replace_scores(create_table):
+    """Copy scores into a new table made by `create_table`, with its indexes, triggers and views."""
+    indexes, triggers, views, view_indexes = dependents()
+    for name, _ in views:
+        op.execute(f'DROP MATERIALIZED VIEW {name}')
+    op.execute('ALTER TABLE scores RENAME TO scores_old')
+    op.execute('ALTER TABLE scores_old RENAME CONSTRAINT scores_pkey TO scores_old_pkey')
+    create_table()
+    op.execute('INSERT INTO scores (id, score, date, student_id, subject_id) '
+               'SELECT id, score, date, student_id, subject_id FROM scores_old')
+    op.execute('ALTER SEQUENCE scores_id_seq OWNED BY scores.id')
+    op.execute('DROP TABLE scores_old')
+    # The rows are copied before the triggers exist: the rollups already count them
+    for statement in [*indexes, *triggers]:
+        op.execute(statement)
+    for name, definition in views:
+        op.execute(f'CREATE MATERIALIZED VIEW {name} AS {definition}')
+    for statement in view_indexes:
+        op.execute(statement)
+
+
+def create_partitioned():
+    op.execute(f'CREATE TABLE scores ({COLUMNS}, PRIMARY KEY (id, date)) PARTITION BY RANGE (date)')
+    # Semesters of the data up to the next one; partitions.py creates the later ones
+    first, last = op.get_bind().execute(sa.text('SELECT min(date), max(date) FROM scores_old')).one()
+    today = datetime.date.today()
+    start = semester_start(min(first or today, today))
+    end = next_semester(semester_start(max(last or today, today)))
+    while start <= end:
+        stop = next_semester(start)
+        name = f'scores_{start.year}_{"spring" if start.month == 2 else "autumn"}'
+        op.execute(f"CREATE TABLE {name} PARTITION OF scores FOR VALUES FROM ('{start}') TO ('{stop}')")
+        start = stop
+    op.execute('CREATE TABLE scores_default PARTITION OF scores DEFAULT')
+
+
+def create_heap():
+    op.execute(f'CREATE TABLE scores ({COLUMNS}, PRIMARY KEY (id))')
+
+
+def upgrade() -> None:
+    replace_scores(create_partitioned)
+
+
+def downgrade() -> None:
+    replace_scores(create_heap)
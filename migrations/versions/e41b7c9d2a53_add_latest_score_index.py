@@ -0,0 +1,27 @@
+"""Add the latest score index
+
+Revision ID: e41b7c9d2a53
+Revises: 7a3e9b1c4d28
+Create Date: 2026-10-18 18:04:51.207336
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41b7c9d2a53'
+down_revision: Union[str, None] = '7a3e9b1c4d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_scores_subject_student_date_desc', 'scores',
+                    ['subject_id', 'student_id', sa.text('date DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scores_subject_student_date_desc', table_name='scores')
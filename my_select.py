@@ -1,154 +1,528 @@
-from sqlalchemy import and_, func, desc
+import functools
+import inspect
 
-from conf.db import session
-from conf.models import Student, Group, Teacher, Score, Subject
+from sqlalchemy import and_, bindparam, func, desc, literal, null, select, union_all
+from sqlalchemy.dialects import postgresql
 
+from cache import cached
+from conf.db import add_profile_argument, apply_profile, session
+from conf.models import (Student, Group, Teacher, Score, Subject, SCORES,
+                         student_subject_scores, group_subject_scores, teacher_scores)
 
-def select_1():
-    students = (session.query(Student.fullname, func.avg(Score.score).label('avg_score'))
-                .join(Score, Score.student_id == Student.id)
-                .group_by(Student.id)
-                .order_by(desc('avg_score')).limit(5).all()
-                )
+
+# The use_aggregates option reads the materialized views (see aggregates.py) instead of
+# scanning scores. They are as fresh as their last refresh.
+# date_from (included) and date_to (excluded) limit the reports to the scores of a period,
+# e.g. partitions.semester(); on PostgreSQL only the partitions of the period are read.
+# The views have no dates: with a period the reports read scores, whatever use_aggregates says.
+#
+# Every report statement is built once per variant (*_statement, with or without the views and
+# the bounds of the period) and the arguments go in as bound parameters: SQLAlchemy finds the
+# statement in its compiled cache without building and hashing it again on every call, and
+# PREPARED_STATEMENTS (statements.py) lets PostgreSQL plan it once per connection.
+
+def aggregated_avg(view):
+    return (func.sum(view.c.score_sum) / func.sum(view.c.score_count)).label('avg_score')
+
+
+def bounds(date_from=None, date_to=None):
+    """The bounds given of a period, part of the variant of a statement."""
+    return date_from is not None, date_to is not None
+
+
+def in_period(stmt, bounded):
+    """Scores of the period only, its bounds are the date_from and date_to parameters."""
+    has_from, has_to = bounded
+    if has_from:
+        stmt = stmt.where(Score.date >= bindparam('date_from'))
+    if has_to:
+        stmt = stmt.where(Score.date < bindparam('date_to'))
+    return stmt
+
+
+def whole_history(date_from, date_to):
+    return date_from is None and date_to is None
+
+
+@functools.lru_cache(maxsize=None)
+def select_1_statement(aggregates, bounded):
+    if aggregates:
+        stmt = (select(Student.fullname, aggregated_avg(student_subject_scores))
+                .join(student_subject_scores, student_subject_scores.c.student_id == Student.id))
+    else:
+        stmt = (select(Student.fullname, func.avg(Score.score).label('avg_score'))
+                .join(Score, Score.student_id == Student.id))
+        stmt = in_period(stmt, bounded)
+    return stmt.group_by(Student.id).order_by(desc('avg_score')).limit(5)
+
+
+@cached('students', 'scores', 'mv_student_subject_scores')
+def select_1(use_aggregates=False, date_from=None, date_to=None):
+    stmt = select_1_statement(use_aggregates and whole_history(date_from, date_to), bounds(date_from, date_to))
+    students = session.execute(stmt, {'date_from': date_from, 'date_to': date_to}).all()
     return [(s.fullname, round(s.avg_score, 2)) for s in students]
 
 
-def select_2(subject):
-    students = (session.query(Student.fullname, func.avg(Score.score).label('avg_score'))
+@functools.lru_cache(maxsize=None)
+def select_2_statement(aggregates, bounded):
+    if aggregates:
+        stmt = (select(Student.fullname, aggregated_avg(student_subject_scores))
+                .join(student_subject_scores, student_subject_scores.c.student_id == Student.id)
+                .join(Subject, Subject.id == student_subject_scores.c.subject_id))
+    else:
+        stmt = (select(Student.fullname, func.avg(Score.score).label('avg_score'))
                 .join(Score, Score.student_id == Student.id)
-                .join(Subject, Subject.id == Score.subject_id)
-                .filter(Subject.name == subject)
-                .group_by(Student.id)
-                .order_by(desc('avg_score')).limit(1).all()
-                )
+                .join(Subject, Subject.id == Score.subject_id))
+        stmt = in_period(stmt, bounded)
+    return (stmt.where(Subject.name == bindparam('subject'))
+            .group_by(Student.id)
+            .order_by(desc('avg_score')).limit(1)
+            )
+
+
+@cached('students', 'scores', 'subjects', 'mv_student_subject_scores')
+def select_2(subject, use_aggregates=False, date_from=None, date_to=None):
+    stmt = select_2_statement(use_aggregates and whole_history(date_from, date_to), bounds(date_from, date_to))
+    students = session.execute(stmt, {'subject': subject, 'date_from': date_from, 'date_to': date_to}).all()
     return (students[0].fullname, round(students[0].avg_score, 2)) if students else None
 
 
-def select_3(subject):
-    groups = (session.query(Group.name, func.avg(Score.score).label('avg_score'))
-              .join(Student, Student.group_id == Group.id)
-              .join(Score, Score.student_id == Student.id)
-              .join(Subject, Score.subject_id == Subject.id)
-              .filter(Subject.name == subject)
-              .group_by(Group.name).all()
-              )
+@functools.lru_cache(maxsize=None)
+def select_3_statement(aggregates, bounded):
+    if aggregates:
+        stmt = (select(Group.name, aggregated_avg(group_subject_scores))
+                .join(group_subject_scores, group_subject_scores.c.group_id == Group.id)
+                .join(Subject, Subject.id == group_subject_scores.c.subject_id))
+    else:
+        stmt = (select(Group.name, func.avg(Score.score).label('avg_score'))
+                .join(Student, Student.group_id == Group.id)
+                .join(Score, Score.student_id == Student.id)
+                .join(Subject, Score.subject_id == Subject.id))
+        stmt = in_period(stmt, bounded)
+    return stmt.where(Subject.name == bindparam('subject')).group_by(Group.name)
+
+
+@cached('groups', 'students', 'scores', 'subjects', 'mv_group_subject_scores')
+def select_3(subject, use_aggregates=False, date_from=None, date_to=None):
+    stmt = select_3_statement(use_aggregates and whole_history(date_from, date_to), bounds(date_from, date_to))
+    groups = session.execute(stmt, {'subject': subject, 'date_from': date_from, 'date_to': date_to}).all()
     return [(g.name, round(g.avg_score, 2)) for g in groups] if groups else []
 
 
-def select_4():
-    scores = session.query(func.avg(Score.score).label('avg_score')).one()
+@functools.lru_cache(maxsize=None)
+def select_4_statement(aggregates, bounded):
+    if aggregates:
+        return select(aggregated_avg(group_subject_scores))
+    return in_period(select(func.avg(Score.score).label('avg_score')), bounded)
+
+
+@cached('scores', 'mv_group_subject_scores')
+def select_4(use_aggregates=False, date_from=None, date_to=None):
+    stmt = select_4_statement(use_aggregates and whole_history(date_from, date_to), bounds(date_from, date_to))
+    scores = session.execute(stmt, {'date_from': date_from, 'date_to': date_to}).one()
     return round(scores.avg_score, 2)
 
 
+SELECT_5 = (select(Subject.name)
+            .join(Teacher, Teacher.id == Subject.teacher_id)
+            .where(Teacher.last_name == bindparam('teacher'))
+            )
+
+
+@cached('subjects', 'teachers')
 def select_5(teacher):
-    subjects = (session.query(Subject.name)
-                .join(Teacher, Teacher.id == Subject.teacher_id)
-                .filter(Teacher.last_name == teacher).all()
-                )
+    subjects = session.execute(SELECT_5, {'teacher': teacher}).all()
     return [s.name for s in subjects]
 
 
+SELECT_6 = (select(Student.fullname)
+            .join(Group, Group.id == Student.group_id)
+            .where(Group.name == bindparam('group'))
+            )
+
+
+@cached('students', 'groups')
 def select_6(group):
-    students = (session.query(Student.fullname)
-                .join(Group, Group.id == Student.group_id)
-                .filter(Group.name == group).all()
-                )
+    students = session.execute(SELECT_6, {'group': group}).all()
     return [s.fullname for s in students]
 
 
-def select_7(group, subject):
-    scores = (session.query(Score.score, Student.fullname)
-              .join(Group, Group.id == Student.group_id)
-              .join(Score, Score.student_id == Student.id)
-              .join(Subject, Subject.id == Score.subject_id)
-              .filter(and_(Group.name == group, Subject.name == subject))
-              .group_by(Score.id, Student.id).all()
-              )
+@functools.lru_cache(maxsize=None)
+def select_7_statement(bounded):
+    # (id, date) is the primary key of the partitioned scores
+    return (in_period(select(Score.score, Student.fullname), bounded)
+            .join(Group, Group.id == Student.group_id)
+            .join(Score, Score.student_id == Student.id)
+            .join(Subject, Subject.id == Score.subject_id)
+            .where(and_(Group.name == bindparam('group'), Subject.name == bindparam('subject')))
+            .group_by(Score.id, Score.date, Student.id)
+            )
+
 
+@cached('scores', 'students', 'groups', 'subjects')
+def select_7(group, subject, date_from=None, date_to=None):
+    scores = session.execute(select_7_statement(bounds(date_from, date_to)),
+                             {'group': group, 'subject': subject, 'date_from': date_from, 'date_to': date_to}).all()
     return [(s.score, s.fullname) for s in scores]
 
 
-def select_8(teacher):
-    scores = (session.query(func.avg(Score.score).label('avg_score'))
-              .join(Subject, Subject.id == Score.subject_id)
-              .join(Teacher, Teacher.id == Subject.teacher_id)
-              .filter(Teacher.last_name == teacher).one()
-              )
+@functools.lru_cache(maxsize=None)
+def select_8_statement(aggregates, bounded):
+    if aggregates:
+        stmt = (select(aggregated_avg(teacher_scores))
+                .select_from(teacher_scores)
+                .join(Teacher, Teacher.id == teacher_scores.c.teacher_id))
+    else:
+        stmt = (select(func.avg(Score.score).label('avg_score'))
+                .join(Subject, Subject.id == Score.subject_id)
+                .join(Teacher, Teacher.id == Subject.teacher_id))
+        stmt = in_period(stmt, bounded)
+    return stmt.where(Teacher.last_name == bindparam('teacher'))
+
+
+@cached('scores', 'subjects', 'teachers', 'mv_teacher_scores')
+def select_8(teacher, use_aggregates=False, date_from=None, date_to=None):
+    stmt = select_8_statement(use_aggregates and whole_history(date_from, date_to), bounds(date_from, date_to))
+    scores = session.execute(stmt, {'teacher': teacher, 'date_from': date_from, 'date_to': date_to}).one()
     return round(scores.avg_score, 2)
 
 
-def select_9(student_fullname):
-    subjects = (session.query(Subject.name)
-                .join(Score, Score.subject_id == Subject.id)
-                .join(Student, Student.id == Score.student_id)
-                .filter(Student.fullname == student_fullname)
-                .group_by(Subject.id).all()
-                )
+@functools.lru_cache(maxsize=None)
+def select_9_statement(bounded):
+    return (in_period(select(Subject.name), bounded)
+            .join(Score, Score.subject_id == Subject.id)
+            .join(Student, Student.id == Score.student_id)
+            .where(Student.fullname == bindparam('student_fullname'))
+            .group_by(Subject.id)
+            )
+
+
+@cached('subjects', 'scores', 'students')
+def select_9(student_fullname, date_from=None, date_to=None):
+    subjects = session.execute(select_9_statement(bounds(date_from, date_to)),
+                               {'student_fullname': student_fullname, 'date_from': date_from,
+                                'date_to': date_to}).all()
     return [s.name for s in subjects]
 
 
-def select_10(student_fullname, teacher_fullname):
-    subjects = (session.query(Subject.name)
-                .join(Teacher, Teacher.id == Subject.teacher_id)
-                .join(Score, Score.subject_id == Subject.id)
-                .join(Student, Student.id == Score.student_id)
-                .filter(and_(Student.fullname == student_fullname, Teacher.fullname == teacher_fullname))
-                .group_by(Subject.id).all()
-                )
+@functools.lru_cache(maxsize=None)
+def select_10_statement(bounded):
+    return (in_period(select(Subject.name), bounded)
+            .join(Teacher, Teacher.id == Subject.teacher_id)
+            .join(Score, Score.subject_id == Subject.id)
+            .join(Student, Student.id == Score.student_id)
+            .where(and_(Student.fullname == bindparam('student_fullname'),
+                        Teacher.fullname == bindparam('teacher_fullname')))
+            .group_by(Subject.id)
+            )
+
+
+@cached('subjects', 'teachers', 'scores', 'students')
+def select_10(student_fullname, teacher_fullname, date_from=None, date_to=None):
+    subjects = session.execute(select_10_statement(bounds(date_from, date_to)),
+                               {'student_fullname': student_fullname, 'teacher_fullname': teacher_fullname,
+                                'date_from': date_from, 'date_to': date_to}).all()
     return [s.name for s in subjects]
 
 
-def select_11(student_fullname, teacher_fullname):
-    scores_subquery = (session.query(Score.score)
+@functools.lru_cache(maxsize=None)
+def select_11_statement(bounded):
+    scores_subquery = (in_period(select(Score.score), bounded)
                        .join(Subject, Subject.id == Score.subject_id)
                        .join(Teacher, Teacher.id == Subject.teacher_id)
                        .join(Student, Student.id == Score.student_id)
-                       .filter(and_(Student.fullname == student_fullname, Teacher.fullname == teacher_fullname))
+                       .where(and_(Student.fullname == bindparam('student_fullname'),
+                                   Teacher.fullname == bindparam('teacher_fullname')))
                        .subquery()
                        )
-
-    score = session.query(func.avg(scores_subquery.c.score)).scalar()
-    return round(score, 2)
+    return select(func.avg(scores_subquery.c.score))
 
 
-def select_12(group, subject):
-    scores_subquery = (session.query(Student.id, func.max(Score.date).label('max_date'))
-                       .join(Student, Student.id == Score.student_id)
-                       .join(Group, Group.id == Student.group_id)
-                       .join(Subject, Subject.id == Score.subject_id)
-                       .filter(and_(Group.name == group, Subject.name == subject))
-                       .group_by(Student.id)
-                       .subquery()
-                       )
+@cached('scores', 'subjects', 'teachers', 'students')
+def select_11(student_fullname, teacher_fullname, date_from=None, date_to=None):
+    score = session.execute(select_11_statement(bounds(date_from, date_to)),
+                            {'student_fullname': student_fullname, 'teacher_fullname': teacher_fullname,
+                             'date_from': date_from, 'date_to': date_to}).scalar()
+    return round(score, 2)
 
-    score = (session.query(Score.score, Student.fullname)
-             .join(Student, Student.id == Score.student_id)
-             .join(scores_subquery, and_(scores_subquery.c.max_date == Score.date, Student.id == scores_subquery.c.id))
-             .all()
-             )
 
-    return score
+@functools.lru_cache(maxsize=None)
+def select_12_statement(bounded):
+    # Latest score of every student of the group in the subject, in one pass over the scores
+    # (ix_scores_subject_student_date_desc); of scores on the same day the last one entered wins
+    ranked = (in_period(select(Score.score, Student.fullname,
+                               func.row_number().over(partition_by=Score.student_id,
+                                                      order_by=(Score.date.desc(), Score.id.desc()))
+                               .label('position')),
+                        bounded)
+              .join(Student, Student.id == Score.student_id)
+              .join(Group, Group.id == Student.group_id)
+              .join(Subject, Subject.id == Score.subject_id)
+              .where(and_(Group.name == bindparam('group'), Subject.name == bindparam('subject')))
+              .subquery()
+              )
+    return select(ranked.c.score, ranked.c.fullname).where(ranked.c.position == 1)
+
+
+@cached('scores', 'students', 'groups', 'subjects')
+def select_12(group, subject, date_from=None, date_to=None):
+    score = session.execute(select_12_statement(bounds(date_from, date_to)),
+                            {'group': group, 'subject': subject, 'date_from': date_from, 'date_to': date_to}).all()
+    return [(s.score, s.fullname) for s in score]
+
+
+@functools.lru_cache(maxsize=None)
+def group_subject_matrix_statement(ranks, aggregates, bounded):
+    if aggregates:
+        cells = (select(Group.name.label('group'), Student.id.label('student_id'), Student.fullname,
+                        Subject.name.label('subject'), student_subject_scores.c.score_sum.label('total'),
+                        student_subject_scores.c.score_count.label('count'))
+                 .join(Student, Student.id == student_subject_scores.c.student_id)
+                 .join(Group, Group.id == Student.group_id)
+                 .join(Subject, Subject.id == student_subject_scores.c.subject_id))
+    else:
+        cells = (in_period(select(Group.name.label('group'), Student.id.label('student_id'), Student.fullname,
+                                  Subject.name.label('subject'), func.sum(Score.score).label('total'),
+                                  func.count().label('count')), bounded)
+                 .join(Student, Student.id == Score.student_id)
+                 .join(Group, Group.id == Student.group_id)
+                 .join(Subject, Subject.id == Score.subject_id)
+                 .group_by(Group.name, Student.id, Student.fullname, Subject.name))
+    cells = cells.cte('cells')
+    avg_score = (func.sum(cells.c.total) / func.sum(cells.c.count)).label('avg_score')
+
+    stmt = (select(literal('subject').label('kind'), cells.c.group, cells.c.subject.label('label'), avg_score,
+                   null().label('rank'))
+            .group_by(cells.c.group, cells.c.subject))
+    if ranks:
+        stmt = union_all(stmt, select(literal('student'), cells.c.group, cells.c.fullname, avg_score,
+                                      func.rank().over(partition_by=cells.c.group, order_by=avg_score.desc()))
+                         .group_by(cells.c.group, cells.c.student_id, cells.c.fullname))
+    return stmt
+
+
+@cached('scores', 'students', 'groups', 'subjects', 'mv_student_subject_scores')
+def group_subject_matrix(ranks=False, use_aggregates=False, date_from=None, date_to=None):
+    """select_3 of every subject in one query, and with `ranks` the students of every group by average score.
+
+    Returns (subjects, [(group, [avg or None for every subject])], [(group, rank, fullname, avg)]).
+    Both come from one pass over the scores, summed per group, student and subject.
+    """
+    stmt = group_subject_matrix_statement(ranks, use_aggregates and whole_history(date_from, date_to),
+                                          bounds(date_from, date_to))
+    rows = session.execute(stmt, {'date_from': date_from, 'date_to': date_to}).all()
+
+    subjects = sorted({row.label for row in rows if row.kind == 'subject'})
+    averages = {}
+    for row in rows:
+        if row.kind == 'subject':
+            averages.setdefault(row.group, {})[row.label] = round(row.avg_score, 2)
+    matrix = [(group, [averages[group].get(subject) for subject in subjects]) for group in sorted(averages)]
+    ranking = sorted((row.group, row.rank, row.label, round(row.avg_score, 2))
+                     for row in rows if row.kind == 'student')
+    return subjects, matrix, ranking
+
+
+# Histogram buckets of score_distribution: the SCORES grades from the lowest, every one
+# up to half the way to the next grade
+GRADES = sorted(SCORES)
+BUCKET_EDGES = [(low + high) / 2 for low, high in zip(GRADES, GRADES[1:])]
+DISTRIBUTION_KEYS = {
+    'subject': Subject.name,
+    'group': Group.name,
+    'teacher': Teacher.fullname,
+}
+PERCENTILES = (0.1, 0.5, 0.9)
+
+
+def bucket_filters():
+    lower = [Score.score >= edge for edge in BUCKET_EDGES]
+    upper = [Score.score < edge for edge in BUCKET_EDGES]
+    return [upper[0], *(and_(low, high) for low, high in zip(lower, upper[1:])), lower[-1]]
+
+
+def histogram_percentile(counts, fraction):
+    """percentile_cont of the scores counted per grade, exact when every score is on the grade scale."""
+    position = fraction * (sum(counts) - 1)
+    below, upper = int(position), int(position) + 1
+
+    def value_at(index):
+        seen = 0
+        for grade, count in zip(GRADES, counts):
+            seen += count
+            if index < seen:
+                return grade
+        return GRADES[-1]
+
+    low = value_at(below)
+    return low + (value_at(upper) - low) * (position - below) if position > below else low
+
+
+@functools.lru_cache(maxsize=None)
+def score_distribution_statement(by, approximate, bounded):
+    key = DISTRIBUTION_KEYS[by]
+    histogram = [func.count().filter(bucket) for bucket in bucket_filters()]
+    columns = [key, func.count()]
+    if not approximate:
+        columns.append(func.percentile_cont(postgresql.array(PERCENTILES)).within_group(Score.score))
+    stmt = (select(*columns, *histogram)
+            .select_from(Score)
+            .join(Student, Student.id == Score.student_id)
+            .join(Group, Group.id == Student.group_id)
+            .join(Subject, Subject.id == Score.subject_id)
+            .join(Teacher, Teacher.id == Subject.teacher_id))
+    return in_period(stmt, bounded).group_by(key).order_by(key)
+
+
+@cached('scores', 'students', 'groups', 'subjects', 'teachers')
+def score_distribution(by='subject', approximate=False, date_from=None, date_to=None):
+    """p10, median, p90 and grade histogram of the scores of every subject, group or teacher.
+
+    Returns [(name, count, p10, median, p90, [count of every grade of GRADES])]. The percentiles come from
+    percentile_cont on PostgreSQL; with `approximate`, and on databases without ordered-set aggregates,
+    they are interpolated from the histogram, computed in one pass without sorting.
+    """
+    approximate = approximate or session.get_bind().dialect.name != 'postgresql'
+    stmt = score_distribution_statement(by, approximate, bounds(date_from, date_to))
+
+    rows = []
+    for name, count, *values in session.execute(stmt, {'date_from': date_from, 'date_to': date_to}).all():
+        if approximate:
+            percentiles = [histogram_percentile(values, fraction) for fraction in PERCENTILES]
+        else:
+            percentiles, values = values[0], values[1:]
+        rows.append((name, count, *(round(value, 2) for value in percentiles), list(values)))
+    return rows
+
+
+# (report, sample arguments, result columns)
+REPORTS = [
+    (select_1, (), ['fullname', 'avg_score']),
+    (select_2, ('Mathematics',), ['fullname', 'avg_score']),
+    (select_3, ('History',), ['group', 'avg_score']),
+    (select_4, (), ['avg_score']),
+    (select_5, ('Франчук',), ['subject']),
+    (select_6, ('G320',), ['fullname']),
+    (select_7, ('G320', 'History'), ['score', 'fullname']),
+    (select_8, ('Ярема',), ['avg_score']),
+    (select_9, ('Варфоломій Рябошапка',), ['subject']),
+    (select_10, ('Варфоломій Рябошапка', 'Єфрем Франчук'), ['subject']),
+    (select_11, ('Варфоломій Рябошапка', 'Єфрем Франчук'), ['avg_score']),
+    (select_12, ('G320', 'History'), ['score', 'fullname']),
+]
+
+
+def sample_values():
+    """Report arguments that exist in the data: the first score's student, group, subject and teacher."""
+    row = session.execute(
+        select(Student.first_name, Student.last_name, Student.id, Group.name,
+               Subject.name, Teacher.first_name, Teacher.last_name)
+        .select_from(Score)
+        .join(Student, Student.id == Score.student_id)
+        .join(Group, Group.id == Student.group_id)
+        .join(Subject, Subject.id == Score.subject_id)
+        .join(Teacher, Teacher.id == Subject.teacher_id)
+        .order_by(Score.id)
+        .limit(1)
+    ).one()
+    return {
+        'student_fullname': f'{row[0]} {row[1]}',
+        'student_id': row[2],
+        'group': row[3],
+        'subject': row[4],
+        'teacher_fullname': f'{row[5]} {row[6]}',
+        'teacher': row[6],
+    }
+
+
+def sample_arguments(report, values):
+    """Keyword arguments of the report from sample_values()."""
+    return {name: values[name] for name in inspect.signature(report).parameters if name in values}
+
+
+def to_rows(result):
+    """Turn a report result (value, tuple, list of values or of tuples) into a list of row tuples."""
+    if result is None:
+        return []
+    if not isinstance(result, list):
+        result = [result]
+    return [tuple(row) if isinstance(row, tuple) else (row,) for row in result]
 
 
 if __name__ == '__main__':
-    func_list = [
-        select_0(),
-        select_1(),
-        select_2('Mathematics'),
-        select_3('History'),
-        select_4(),
-        select_5('Франчук'),
-        select_6('G320'),
-        select_7('G320', 'History'),
-        select_8('Ярема'),
-        select_9('Варфоломій Рябошапка'),
-        select_10('Варфоломій Рябошапка', 'Єфрем Франчук'),
-        select_11('Варфоломій Рябошапка', 'Єфрем Франчук'),
-        select_12('G320', 'History')
-    ]
-
-    for i, func in enumerate(func_list):
-        print(f'\n----------------------- func #: {i + 1} --------------------------\n')
-        print(func)
-
-
+    import argparse
+    import datetime
+    import sys
+
+    from cache import stats
+    from output import FORMATS, write_rows
+
+    parser = argparse.ArgumentParser(description='Run the select_1 - select_12 reports with sample arguments')
+    parser.add_argument('--format', choices=FORMATS, help='Write rows in this format instead of printing results.')
+    parser.add_argument('--report', type=int, action='append', choices=range(1, len(REPORTS) + 1),
+                        help='Report number, can be repeated. All reports by default.', metavar='N')
+    parser.add_argument('--from', dest='date_from', type=datetime.date.fromisoformat, metavar='DATE',
+                        help='Only scores dated from this day.')
+    parser.add_argument('--to', dest='date_to', type=datetime.date.fromisoformat, metavar='DATE',
+                        help='Only scores dated before this day.')
+    parser.add_argument('--semester', action='store_true', help='Only scores of the current semester.')
+    parser.add_argument('--matrix', action='store_true',
+                        help='Print the group x subject averages (group_subject_matrix) instead of the reports.')
+    parser.add_argument('--ranks', action='store_true', help='With --matrix: also the students of every group by rank.')
+    parser.add_argument('--aggregates', action='store_true',
+                        help='With --matrix: read the materialized views instead of scores.')
+    parser.add_argument('--distribution', choices=list(DISTRIBUTION_KEYS),
+                        help='Print p10, median, p90 and the grade histogram per subject, group or teacher instead.')
+    parser.add_argument('--approximate', action='store_true',
+                        help='With --distribution: percentiles from the histogram, without sorting the scores.')
+    parser.add_argument('--cache-stats', action='store_true',
+                        help='Print the hits and misses of the report cache and of the compiled statement cache.')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+    numbers = argv.report or range(1, len(REPORTS) + 1)
+    if argv.semester:
+        from partitions import semester
+        argv.date_from, argv.date_to = semester()
+    period = {'date_from': argv.date_from, 'date_to': argv.date_to}
+    # --distribution and --matrix replace the reports, --ranks adds a second result to the matrix
+    results = bool(argv.distribution) + (1 + argv.ranks if argv.matrix else 0) or len(numbers)
+    if argv.format in ('arrow', 'parquet') and results != 1:
+        parser.error(f'--format {argv.format} writes a single result: one --report, --distribution, '
+                     f'or --matrix without --ranks')
+
+    if argv.distribution:
+        rows = [(name, count, *percentiles, *histogram)
+                for name, count, *percentiles, histogram in score_distribution(argv.distribution, argv.approximate,
+                                                                              **period)]
+        write_rows([argv.distribution, 'count', 'p10', 'median', 'p90', *map(str, GRADES)], [rows],
+                   argv.format or 'table')
+        numbers = []
+
+    if argv.matrix:
+        subjects, matrix, ranking = group_subject_matrix(argv.ranks, argv.aggregates, **period)
+        write_rows(['group', *subjects], [[(group, *averages) for group, averages in matrix]], argv.format or 'table')
+        if argv.ranks:
+            write_rows(['group', 'rank', 'fullname', 'avg_score'], [ranking], argv.format or 'table')
+        numbers = []
+
+    for i in numbers:
+        report, args, columns = REPORTS[i - 1]
+        kwargs = period if 'date_from' in inspect.signature(report).parameters else {}
+        if argv.format is None:
+            print(f'\n----------------------- func #: {i} --------------------------\n')
+            print(report(*args, **kwargs))
+        elif argv.format == 'jsonl':
+            rows = [(report.__name__, *row) for row in to_rows(report(*args, **kwargs))]
+            write_rows(['report', *columns], [rows], argv.format)
+        else:
+            if argv.format in ('text', 'csv') and len(numbers) > 1:
+                sys.stdout.write(f'# {report.__name__}\n')
+            write_rows(columns, [to_rows(report(*args, **kwargs))], argv.format)
+
+    if argv.cache_stats:
+        from conf.db import get_engine
+        from statements import format_stats
+
+        print(f'cache: {stats["hits"]} hits, {stats["misses"]} misses', file=sys.stderr)
+        print('\n'.join(format_stats(get_engine())), file=sys.stderr)
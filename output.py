@@ -0,0 +1,96 @@
+"""Row writers for the CLI output.
+
+Every writer takes the column names and an iterable of row batches (for example
+`Result.partitions()`), and writes each batch as soon as it arrives. Only `table`
+collects all rows first, PrettyTable needs them to size the columns.
+"""
+import csv
+import json
+import sys
+
+
+def write_table(columns, batches, stream):
+    from prettytable import PrettyTable
+
+    table = PrettyTable(columns)
+    for rows in batches:
+        table.add_rows(rows)
+    stream.write(table.get_string() + '\n')
+
+
+def write_text(columns, batches, stream):
+    stream.write(' | '.join(columns) + '\n')
+    for rows in batches:
+        stream.write(''.join(' | '.join(map(str, row)) + '\n' for row in rows))
+
+
+def write_csv(columns, batches, stream):
+    writer = csv.writer(stream)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+
+
+def write_jsonl(columns, batches, stream):
+    for rows in batches:
+        stream.write(''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + '\n'
+                             for row in rows))
+
+
+def _record_batches(columns, batches):
+    import pyarrow as pa
+
+    for rows in batches:
+        if rows:
+            yield pa.record_batch([pa.array(values) for values in zip(*rows)], names=columns)
+
+
+def _empty_schema(columns):
+    """Schema of a result without rows: the column names, with the null type."""
+    import pyarrow as pa
+
+    return pa.schema([(name, pa.null()) for name in columns])
+
+
+def write_arrow(columns, batches, stream):
+    """Arrow IPC stream format, needs pyarrow."""
+    import pyarrow as pa
+
+    writer = None
+    for batch in _record_batches(columns, batches):
+        if writer is None:
+            writer = pa.ipc.new_stream(stream.buffer, batch.schema)
+        writer.write_batch(batch)
+    if writer is None:
+        # The stream still starts with a schema, that readers need even without rows
+        writer = pa.ipc.new_stream(stream.buffer, _empty_schema(columns))
+    writer.close()
+
+
+def write_parquet(columns, batches, stream):
+    """Parquet file, one row group per batch, needs pyarrow."""
+    import pyarrow.parquet as pq
+
+    writer = None
+    for batch in _record_batches(columns, batches):
+        if writer is None:
+            writer = pq.ParquetWriter(stream.buffer, batch.schema)
+        writer.write_batch(batch)
+    if writer is None:
+        writer = pq.ParquetWriter(stream.buffer, _empty_schema(columns))
+    writer.close()
+
+
+WRITERS = {
+    'table': write_table,
+    'text': write_text,
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'arrow': write_arrow,
+    'parquet': write_parquet,
+}
+FORMATS = list(WRITERS)
+
+
+def write_rows(columns, batches, fmt='table', stream=None):
+    WRITERS[fmt](columns, batches, stream or sys.stdout)
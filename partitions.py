@@ -0,0 +1,139 @@
+"""Semester partitions of scores (PostgreSQL, migration b7f2a0c86d14).
+
+scores is partitioned by date, one partition per semester: autumn from September 1
+to February 1, spring from February 1 to September 1. Rows outside of every
+partition go to scores_default.
+    python partitions.py                          # partitions, bounds and estimated rows
+    python partitions.py --create-ahead 2         # up to two semesters after the current one
+    python partitions.py --create-from 2023-09-01 # past semesters too, rows move out of scores_default
+    python partitions.py --detach-before 2024-09-01 [--drop]
+A detached partition stays as a plain table (scores_2023_autumn...) unless --drop is given.
+"""
+import argparse
+import datetime
+import time
+
+from sqlalchemy import text
+
+from cache import invalidate
+from conf.db import add_profile_argument, apply_profile, session
+
+DEFAULT = 'scores_default'
+
+
+def semester(day=None):
+    """(first day, first day of the next semester) of the semester of `day`, today by default."""
+    day = day or datetime.date.today()
+    if day.month >= 9:
+        start = datetime.date(day.year, 9, 1)
+    elif day.month >= 2:
+        start = datetime.date(day.year, 2, 1)
+    else:
+        start = datetime.date(day.year - 1, 9, 1)
+    return start, next_semester(start)
+
+
+def next_semester(start):
+    return datetime.date(start.year, 9, 1) if start.month == 2 else datetime.date(start.year + 1, 2, 1)
+
+
+def partition_name(start):
+    return f'scores_{start.year}_{"spring" if start.month == 2 else "autumn"}'
+
+
+def list_partitions():
+    """(name, first day, first day after, estimated rows) of every partition; None bounds for the default one."""
+    rows = session.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'scores'::regclass")).all()
+    partitions = []
+    for name, bound, estimate in rows:
+        start = end = None
+        if bound != 'DEFAULT':
+            # FOR VALUES FROM ('2025-09-01') TO ('2026-02-01')
+            start, end = (datetime.date.fromisoformat(value) for value in bound.split("'")[1::2])
+        partitions.append((name, start, end, max(int(estimate), 0)))
+    return sorted(partitions, key=lambda p: (p[1] is None, p[1]))
+
+
+def create_partition(start):
+    """Create the partition of the semester starting on `start`, moving its rows out of scores_default.
+
+    Returns False if it already exists.
+    """
+    name, end = partition_name(start), next_semester(start)
+    if any(p[0] == name for p in list_partitions()):
+        return False
+    in_range = {'start': start, 'end': end}
+    # A new partition cannot be attached while scores_default holds rows of its range. The rows are moved
+    # through the partitions directly, which bypasses the statement triggers of scores: the rollups stay right.
+    session.execute(text(f'CREATE TABLE {name} (LIKE scores INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    session.execute(text(f'INSERT INTO {name} SELECT * FROM {DEFAULT} WHERE date >= :start AND date < :end'),
+                    in_range)
+    session.execute(text(f'DELETE FROM {DEFAULT} WHERE date >= :start AND date < :end'), in_range)
+    session.execute(text(f"ALTER TABLE scores ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+    return True
+
+
+def create_partitions(first, ahead):
+    """Partitions of every semester from the one of `first` to `ahead` semesters after the current one."""
+    start = semester(first)[0]
+    last = semester()[0]
+    for _ in range(ahead):
+        last = next_semester(last)
+    created = []
+    while start <= last:
+        if create_partition(start):
+            created.append(partition_name(start))
+        start = next_semester(start)
+    session.commit()
+    return created
+
+
+def detach_partitions(before, drop=False):
+    """Detach the partitions that end on or before `before`, returns their names.
+
+    Their scores leave the reports, so the rollups and the materialized views are recomputed.
+    """
+    names = [name for name, _, end, _ in list_partitions() if end is not None and end <= before]
+    for name in names:
+        session.execute(text(f'ALTER TABLE scores DETACH PARTITION {name}'))
+        if drop:
+            session.execute(text(f'DROP TABLE {name}'))
+    session.commit()
+    if names:
+        from aggregates import refresh_aggregates
+        from rollups import rebuild_rollups
+
+        rebuild_rollups()
+        refresh_aggregates()
+        invalidate('scores')
+    return names
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create and detach the semester partitions of scores')
+    parser.add_argument('--create-ahead', type=int, metavar='N',
+                        help='Create the partitions up to N semesters after the current one.')
+    parser.add_argument('--create-from', type=datetime.date.fromisoformat, metavar='DATE',
+                        help='With --create-ahead: start from the semester of this date instead of the current one.')
+    parser.add_argument('--detach-before', type=datetime.date.fromisoformat, metavar='DATE',
+                        help='Detach the partitions that end on or before this date.')
+    parser.add_argument('--drop', action='store_true', help='Drop the detached partitions.')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+
+    start = time.perf_counter()
+    if argv.create_ahead is not None or argv.create_from:
+        created = create_partitions(argv.create_from, argv.create_ahead or 0)
+        print(f'Created: {", ".join(created) or "nothing"}')
+    if argv.detach_before:
+        detached = detach_partitions(argv.detach_before, argv.drop)
+        print(f'{"Dropped" if argv.drop else "Detached"}: {", ".join(detached) or "nothing"}')
+
+    for name, first_day, end, estimate in list_partitions():
+        bounds = f'{first_day} - {end}' if first_day else 'default'
+        print(f'{name:22} {bounds:25} ~{estimate} rows')
+    print(f'{time.perf_counter() - start:.2f}s')
@@ -0,0 +1,50 @@
+"""Run the my_select reports in a thread pool, for deployments without asyncpg.
+
+Each worker thread uses its own Session (conf.db keeps one per thread with
+scoped_session), which is closed when the job is done.
+    python report_runner.py --workers 5
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from conf.db import add_profile_argument, apply_profile, remove_session
+from my_select import REPORTS
+
+
+def run_job(report, args):
+    start = time.perf_counter()
+    try:
+        result = report(*args)
+    except Exception as e:
+        result = e
+    finally:
+        remove_session()
+    return result, time.perf_counter() - start
+
+
+def run_reports(jobs, workers=5):
+    """Run (report, args) jobs, returns (result or exception, seconds) for every job, in the order of the jobs.
+
+    Keep `workers` within POOL_SIZE + MAX_OVERFLOW of the profile, extra threads wait for a connection.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report') as executor:
+        futures = [executor.submit(run_job, report, args) for report, args in jobs]
+        return [future.result() for future in futures]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run select_1 - select_12 in a thread pool')
+    parser.add_argument('--workers', type=int, default=5, help='Threads, each with its own connection.')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+
+    start = time.perf_counter()
+    results = run_reports([(report, args) for report, args, _ in REPORTS], argv.workers)
+    total = time.perf_counter() - start
+
+    for (report, args, _), (result, seconds) in zip(REPORTS, results):
+        print(f'\n----------------------- {report.__name__} ({seconds * 1000:.1f} ms) --------------------------\n')
+        print(result)
+    print(f'\nTotal: {total * 1000:.1f} ms, sum of reports: {sum(s for _, s in results) * 1000:.1f} ms')
@@ -0,0 +1,140 @@
+"""Long-running HTTP/JSON server for the my_select reports.
+
+    python report_server.py --port 8000 [--no-cache]
+    curl 'http://127.0.0.1:8000/select_2?subject=Mathematics'
+    curl 'http://127.0.0.1:8000/select_4?use_aggregates=true'
+    curl 'http://127.0.0.1:8000/reports'
+
+Query parameters are the arguments of the report function. The engine, its pool and
+SQLAlchemy's compiled statement cache stay warm between requests; every request runs
+on its own thread with its own Session, closed when the response is sent.
+With the memory cache backend, writes made by other processes are seen after the
+cache TTL; use BACKEND=sqlite in config.ini to share invalidation with the CLI.
+"""
+import argparse
+import datetime
+import inspect
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import cache
+from conf import db
+from conf.db import add_profile_argument, apply_profile, get_engine, remove_session
+from my_select import REPORTS, sample_arguments, sample_values
+
+REPORTS_BY_NAME = {report.__name__: report for report, _, _ in REPORTS}
+TRUE = ('1', 'true', 'yes')
+# Report parameters given as ISO dates, e.g. date_from=2024-09-01
+DATES = ('date_from', 'date_to')
+
+
+def report_arguments(report, query):
+    """Keyword arguments of the report from the query string, raises ValueError when they do not fit."""
+    parameters = inspect.signature(report).parameters
+    unknown = query.keys() - parameters.keys()
+    if unknown:
+        raise ValueError(f'Unknown parameters: {", ".join(sorted(unknown))}')
+    kwargs = {}
+    for name, parameter in parameters.items():
+        if name not in query:
+            if parameter.default is inspect.Parameter.empty:
+                raise ValueError(f'Missing parameter: {name}')
+            continue
+        value = query[name][-1]
+        if isinstance(parameter.default, bool):
+            value = value.lower() in TRUE
+        elif name in DATES:
+            try:
+                value = datetime.date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f'Bad date for {name}: {value!r}, expected YYYY-MM-DD') from None
+        kwargs[name] = value
+    return kwargs
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, without TCP_NODELAY a keep-alive client waits for the delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        name = url.path.strip('/')
+        if name in ('', 'reports'):
+            return self.send_json(200, {name: list(inspect.signature(report).parameters)
+                                        for name, report in REPORTS_BY_NAME.items()})
+        report = REPORTS_BY_NAME.get(name)
+        if report is None:
+            return self.send_json(404, {'error': f'Unknown report: {name}'})
+        try:
+            kwargs = report_arguments(report, parse_qs(url.query))
+        except ValueError as e:
+            return self.send_json(400, {'error': str(e)})
+
+        start = time.perf_counter()
+        try:
+            result = report(**kwargs)
+        except Exception as e:
+            return self.send_json(500, {'report': name, 'error': f'{type(e).__name__}: {e}'})
+        finally:
+            remove_session()
+        self.send_json(200, {'report': name, 'result': result, 'ms': round((time.perf_counter() - start) * 1000, 2)})
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def warm_up():
+    """Open the pooled connections and run every report once, with arguments found in the data."""
+    if db.config[db.profile].get('POOL', fallback='queue') != 'null':
+        pool_size = db.config[db.profile].getint('POOL_SIZE', fallback=5)
+        connections = [get_engine().connect() for _ in range(pool_size)]
+        for connection in connections:
+            connection.close()
+    try:
+        values = sample_values()
+    except Exception as e:
+        # An empty database or missing tables: every report would fail the same way
+        print(f'warm-up: no sample arguments: {type(e).__name__}: {e}', file=sys.stderr)
+    else:
+        for report, _, _ in REPORTS:
+            try:
+                report(**sample_arguments(report, values))
+            except Exception as e:
+                print(f'warm-up: {report.__name__} failed: {type(e).__name__}: {e}', file=sys.stderr)
+    remove_session()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the my_select reports as JSON over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    add_profile_argument(parser)
+    parser.add_argument('--quiet', action='store_true', help='Do not log every request.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Run every request against the database, without the report cache.')
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+
+    if argv.no_cache:
+        cache.backend = None
+    warm_up()
+    server = ThreadingHTTPServer((argv.host, argv.port), ReportHandler)
+    server.quiet = argv.quiet
+    print(f'Serving reports on http://{argv.host}:{argv.port}/reports')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
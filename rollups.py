@@ -0,0 +1,76 @@
+import argparse
+
+from sqlalchemy import Numeric, cast, delete, func, insert, select
+
+from conf.db import add_profile_argument, apply_profile, session
+from conf.models import Student, Score, StudentScoreRollup, SubjectScoreRollup, GroupScoreRollup
+
+# rollup model, its key column, the same key computed from scores (with the join it needs)
+ROLLUPS = [
+    (StudentScoreRollup, StudentScoreRollup.student_id, Score.student_id),
+    (SubjectScoreRollup, SubjectScoreRollup.subject_id, Score.subject_id),
+    (GroupScoreRollup, GroupScoreRollup.group_id, Student.group_id),
+]
+
+
+def average(model, key):
+    """O(1) average from a rollup row, None when there are no scores."""
+    rollup = session.get(model, key)
+    if not rollup or not rollup.score_count:
+        return None
+    return round(float(rollup.score_sum / rollup.score_count), 2)
+
+
+def student_average(student_id):
+    return average(StudentScoreRollup, student_id)
+
+
+def subject_average(subject_id):
+    return average(SubjectScoreRollup, subject_id)
+
+
+def group_average(group_id):
+    return average(GroupScoreRollup, group_id)
+
+
+def recompute(key):
+    stmt = select(key, func.sum(cast(Score.score, Numeric)), func.count()).group_by(key)
+    if key is Student.group_id:
+        stmt = stmt.join(Student, Student.id == Score.student_id)
+    return stmt
+
+
+def verify_rollups():
+    """Compare every rollup with a full recompute, returns a list of mismatch descriptions."""
+    mismatches = []
+    for model, key, source in ROLLUPS:
+        expected = {row[0]: (row[1], row[2]) for row in session.execute(recompute(source))}
+        stored = {row[0]: (row[1], row[2])
+                  for row in session.execute(select(key, model.score_sum, model.score_count))
+                  if row[2] or row[1]}
+        for item in expected.keys() | stored.keys():
+            if expected.get(item) != stored.get(item):
+                mismatches.append(f'{model.__tablename__} {item}: stored {stored.get(item)}, '
+                                  f'expected {expected.get(item)}')
+    return mismatches
+
+
+def rebuild_rollups():
+    for model, key, source in ROLLUPS:
+        session.execute(delete(model))
+        session.execute(insert(model).from_select([key.key, 'score_sum', 'score_count'], recompute(source)))
+    session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check or rebuild the score rollups')
+    parser.add_argument('--rebuild', action='store_true', help='Recompute all rollups from scores.')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+
+    if argv.rebuild:
+        rebuild_rollups()
+    errors = verify_rollups()
+    print('\n'.join(errors) if errors else 'Rollups are consistent.')
+    raise SystemExit(1 if errors else 0)
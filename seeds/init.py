@@ -1,13 +1,24 @@
+import argparse
+import csv
+import datetime
+import io
+import random
+import time
+from itertools import islice
 from random import choice, choices, randint
 
 from faker import Faker
+from sqlalchemy import insert, select
 from sqlalchemy.exc import SQLAlchemyError
 
-from conf.db import session
-from conf.models import Student, Group, Teacher, Score, Subject
+from conf.db import add_profile_argument, apply_profile, session
+from conf.models import Student, Group, Teacher, Score, Subject, SCORES
 
 fake = Faker('uk-UA')
-SCORES = [4.0, 3.7, 3.3, 3.0, 2.7, 2.3, 2.0, 1.7, 1.3, 1.0, 0.0]
+# How often each of SCORES is drawn
+SCORE_WEIGHTS = [5, 6, 7, 8, 8, 8, 6, 3, 2, 1, 1]
+# Last day of the two years of generated scores: fixed, so that a --seed gives the same data every day
+SCORES_UNTIL = datetime.date(2026, 9, 1)
 SUBJECTS = [
     'Mathematics',
     'Physics',
@@ -68,7 +79,7 @@ def insert_scores(scores_count):
     for student in students:
         for _ in range(scores_count):
             score = Score(
-                score=choices(SCORES, weights=[5, 6, 7, 8, 8, 8, 6, 3, 2, 1, 1], k=1)[0],
+                score=choices(SCORES, weights=SCORE_WEIGHTS, k=1)[0],
                 date=fake.date_between(start_date='-2y'),
                 student_id=student.id,
                 subject_id=choice(subjects).id,
@@ -76,19 +87,175 @@ def insert_scores(scores_count):
             session.add(score)
 
 
+def generate_groups(groups_count):
+    for _ in range(groups_count):
+        yield ('G' + str(randint(300, 399)),)
+
+
+def generate_teachers(teachers_count):
+    for _ in range(teachers_count):
+        yield fake.first_name(), fake.last_name()
+
+
+def generate_subjects(teacher_ids):
+    for sub in SUBJECTS:
+        yield sub, choice(teacher_ids)
+
+
+def generate_students(students_count, group_ids, fake=fake, rng=random):
+    for _ in range(students_count):
+        yield fake.first_name(), fake.last_name(), rng.choice(group_ids)
+
+
+def generate_scores(scores_count, student_ids, subject_ids, rng=random, until=SCORES_UNTIL):
+    # Same distribution as fake.date_between(start_date='-2y'), without the Faker overhead per row.
+    # Two years as a number of days: date.replace(year=...) fails on February 29
+    days = 730
+    for student_id in student_ids:
+        for _ in range(scores_count):
+            yield (
+                rng.choices(SCORES, weights=SCORE_WEIGHTS, k=1)[0],
+                until - datetime.timedelta(days=rng.randint(0, days)),
+                student_id,
+                rng.choice(subject_ids),
+            )
+
+
+def batched(rows, batch_size):
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def bulk_insert(model, columns, rows, batch_size, session=session):
+    """Insert tuples in batches of executemany, returns the number of rows."""
+    count = 0
+    for batch in batched(rows, batch_size):
+        session.execute(insert(model.__table__), [dict(zip(columns, row)) for row in batch])
+        count += len(batch)
+    return count
+
+
+def copy_insert(model, columns, rows, batch_size, session=session):
+    """Stream tuples through PostgreSQL COPY FROM STDIN (psycopg2 only), returns the number of rows."""
+    cursor = session.connection().connection.cursor()
+    sql = f'COPY {model.__tablename__} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)'
+    count = 0
+    for batch in batched(rows, batch_size):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+        count += len(batch)
+    return count
+
+
+WRITERS = {'bulk': bulk_insert, 'copy': copy_insert}
+
+
+def report_rate(label, count, elapsed):
+    rate = count / elapsed if elapsed else 0
+    print(f'{label}: {count} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)')
+    return {'rows': count, 'seconds': round(elapsed, 3), 'rows_per_s': round(rate)}
+
+
+def timed(label, writer, model, columns, rows, batch_size):
+    start = time.perf_counter()
+    count = writer(model, columns, rows, batch_size)
+    return report_rate(label, count, time.perf_counter() - start)
+
+
+def ids(model):
+    return session.scalars(select(model.id)).all()
+
+
+def seed_bulk(args):
+    """Fill the tables with executemany or COPY, returns the rows and rate of every table."""
+    writer = WRITERS[args.mode]
+    rates = {
+        'groups': timed('groups', writer, Group, ['name'], generate_groups(args.groups), args.batch_size),
+        'teachers': timed('teachers', writer, Teacher, ['first_name', 'last_name'],
+                          generate_teachers(args.teachers), args.batch_size),
+        'subjects': timed('subjects', writer, Subject, ['name', 'teacher_id'],
+                          generate_subjects(ids(Teacher)), args.batch_size),
+    }
+
+    if args.workers:
+        from seeds.parallel import parallel_students
+        students = parallel_students(args.students, ids(Group), args.workers, args.seed, args.batch_size)
+    else:
+        students = generate_students(args.students, ids(Group))
+    rates['students'] = timed('students', writer, Student, ['first_name', 'last_name', 'group_id'],
+                              students, args.batch_size)
+    session.commit()
+
+    student_ids, subject_ids = ids(Student), ids(Subject)
+    if args.workers and args.parallel_write:
+        from seeds.parallel import parallel_write_scores
+        start = time.perf_counter()
+        count = parallel_write_scores(args.scores, student_ids, subject_ids, args.workers, args.seed,
+                                      args.batch_size, args.mode, args.until)
+        rates['scores'] = report_rate('scores', count, time.perf_counter() - start)
+    else:
+        if args.workers:
+            from seeds.parallel import parallel_scores
+            scores = parallel_scores(args.scores, student_ids, subject_ids, args.workers, args.seed, args.batch_size,
+                                     args.until)
+        else:
+            scores = generate_scores(args.scores, student_ids, subject_ids, until=args.until)
+        rates['scores'] = timed('scores', writer, Score, ['score', 'date', 'student_id', 'subject_id'],
+                                scores, args.batch_size)
+    session.commit()
+    return rates
+
+
+def seed_orm(args):
+    insert_groups(args.groups)
+    insert_teachers(args.teachers)
+    session.commit()
+    insert_students(args.students)
+    insert_subjects()
+    session.commit()
+    count = len(ids(Student)) * args.scores
+    start = time.perf_counter()
+    insert_scores(args.scores)
+    session.commit()
+    report_rate('scores', count, time.perf_counter() - start)
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fill the database with fake data')
+    parser.add_argument('--mode', choices=['orm', 'bulk', 'copy'], default='orm',
+                        help='orm - one object per row, bulk - batched executemany, copy - PostgreSQL COPY.')
+    parser.add_argument('--groups', type=int, default=3)
+    parser.add_argument('--teachers', type=int, default=5)
+    parser.add_argument('--students', type=int, default=50)
+    parser.add_argument('--scores', type=int, default=20, help='Scores per student.')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Generate students and scores in N processes (bulk and copy modes).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the parallel generator, for reproducible data.')
+    parser.add_argument('--parallel-write', action='store_true',
+                        help='Workers insert their own score shards over separate connections, '
+                             'each shard is committed on its own.')
+    parser.add_argument('--until', type=datetime.date.fromisoformat, default=SCORES_UNTIL, metavar='DATE',
+                        help=f'Scores are dated in the two years up to this day ({SCORES_UNTIL} by default, '
+                             f'bulk and copy modes).')
+    add_profile_argument(parser)
+    argv = parser.parse_args()
+    apply_profile(parser, argv)
+    if argv.mode == 'orm' and (argv.workers or argv.parallel_write):
+        parser.error('--workers and --parallel-write need --mode bulk or copy')
+    if argv.parallel_write and not argv.workers:
+        parser.error('--parallel-write needs --workers')
+
     try:
-        insert_groups(3)
-        insert_teachers(5)
-        session.commit()
-        insert_students(50)
-        insert_subjects()
-        session.commit()
-        insert_scores(20)
-        session.commit()
+        if argv.mode == 'orm':
+            seed_orm(argv)
+        else:
+            seed_bulk(argv)
     except SQLAlchemyError as e:
         print(e)
         session.rollback()
     finally:
         session.close()
-
@@ -0,0 +1,90 @@
+"""Multi-process fake data generator.
+
+The work is split into shards of about `batch_size` rows. Every shard gets its own
+Faker and Random seeded with (seed, shard number), so the output depends only on
+the seed and the batch size, not on the number of workers. Batches come back in
+shard order and are written by the single writer in seeds/init.py, or, with
+parallel_write_scores, every worker writes its shards over its own connection.
+"""
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from faker import Faker
+
+from conf import db
+from conf.models import Score
+from seeds.init import WRITERS, generate_students, generate_scores
+
+_fake = None
+
+
+def _shard_fake(seed):
+    global _fake
+    if _fake is None:
+        _fake = Faker('uk-UA')
+    _fake.seed_instance(seed)
+    return _fake
+
+
+def _students_shard(shard, seed, count, group_ids):
+    shard_seed = f'{seed}:{shard}'
+    return list(generate_students(count, group_ids, fake=_shard_fake(shard_seed), rng=random.Random(shard_seed)))
+
+
+def _scores_shard(shard, seed, scores_count, student_ids, subject_ids, until):
+    return list(generate_scores(scores_count, student_ids, subject_ids, rng=random.Random(f'{seed}:{shard}'),
+                                until=until))
+
+
+def _write_scores_shard(mode, shard, seed, scores_count, student_ids, subject_ids, until):
+    rows = _scores_shard(shard, seed, scores_count, student_ids, subject_ids, until)
+    with db.get_session_factory()() as worker_session:
+        count = WRITERS[mode](Score, ['score', 'date', 'student_id', 'subject_id'], rows, len(rows),
+                              session=worker_session)
+        worker_session.commit()
+    return count
+
+
+def _init_worker(profile):
+    # A spawned worker starts with the default profile, a forked one with the connections of the parent,
+    # which must not be reused
+    db.set_profile(profile)
+    db.get_engine().dispose(close=False)
+
+
+def _ordered_results(workers, func, tasks):
+    """Like executor.map, but keeps only 2 * workers shards in flight to bound memory."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(func, *task))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def parallel_students(students_count, group_ids, workers, seed, batch_size):
+    tasks = ((shard, seed, min(batch_size, students_count - start), group_ids)
+             for shard, start in enumerate(range(0, students_count, batch_size)))
+    return _ordered_results(workers, _students_shard, tasks)
+
+
+def _score_tasks(scores_count, student_ids, subject_ids, seed, batch_size, until):
+    students_per_shard = max(1, batch_size // max(scores_count, 1))
+    return ((shard, seed, scores_count, student_ids[start:start + students_per_shard], subject_ids, until)
+            for shard, start in enumerate(range(0, len(student_ids), students_per_shard)))
+
+
+def parallel_scores(scores_count, student_ids, subject_ids, workers, seed, batch_size, until):
+    tasks = _score_tasks(scores_count, student_ids, subject_ids, seed, batch_size, until)
+    return _ordered_results(workers, _scores_shard, tasks)
+
+
+def parallel_write_scores(scores_count, student_ids, subject_ids, workers, seed, batch_size, mode, until):
+    """Generate and insert scores in the workers, `mode` is a key of WRITERS. Returns the number of rows."""
+    tasks = _score_tasks(scores_count, student_ids, subject_ids, seed, batch_size, until)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db.profile,)) as executor:
+        futures = [executor.submit(_write_scores_shard, mode, *task) for task in tasks]
+        return sum(future.result() for future in futures)
@@ -0,0 +1,174 @@
+"""Compiled statement cache statistics and server-side prepared statements for the engine of conf.db.
+
+Every execution is counted by the outcome of SQLAlchemy's compiled cache (the "[cached since]" /
+"[generated in]" of echo=True):
+    python my_select.py --cache-stats
+A statement without a cache key is compiled again on every call; such statements are listed too.
+
+With PREPARED_STATEMENTS=true in the profile (PostgreSQL with psycopg2, which has no prepared statements
+of its own), a SELECT is prepared once per connection with PREPARE and then run with EXECUTE, so that
+PostgreSQL parses and plans it once instead of on every call. Prepared statements belong to a connection:
+they only pay off with a pool that keeps connections (POOL=queue), and not behind PgBouncer in transaction
+mode. asyncpg prepares and caches statements by itself (async_select.py).
+"""
+import functools
+import hashlib
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.engine.interfaces import CacheStats
+
+# Prepared statements kept per connection, the least recently used is deallocated beyond it
+PREPARED_PER_CONNECTION = 200
+OUTCOMES = {
+    CacheStats.CACHE_HIT: 'hits',
+    CacheStats.CACHE_MISS: 'misses',
+    CacheStats.CACHING_DISABLED: 'disabled',
+    CacheStats.NO_CACHE_KEY: 'no_key',
+    CacheStats.NO_DIALECT_SUPPORT: 'no_dialect_support',
+}
+
+stats = dict.fromkeys(OUTCOMES.values(), 0)
+stats.update(raw=0, prepared=0, refused=0, executed=0)
+# Statements compiled on every call: statement -> executions
+uncached = Counter()
+stats_lock = threading.Lock()
+_engines = set()
+
+PLACEHOLDER = re.compile(r'%\((\w+)\)s')
+
+
+def count_execution(conn, cursor, statement, parameters, context, executemany):
+    if context.compiled is None:
+        outcome = 'raw'
+    else:
+        outcome = OUTCOMES[context.cache_hit]
+    with stats_lock:
+        stats[outcome] += 1
+        if outcome in ('no_key', 'disabled'):
+            uncached[statement] += 1
+
+
+@functools.lru_cache(maxsize=1024)
+def rewrite(statement):
+    """(name, parameter names in $n order, body of PREPARE, EXECUTE statement) of a psycopg2 statement."""
+    names = list(dict.fromkeys(PLACEHOLDER.findall(statement)))
+    positions = {name: i for i, name in enumerate(names, 1)}
+    body = PLACEHOLDER.sub(lambda m: f'${positions[m.group(1)]}', statement).replace('%%', '%')
+    name = 'sa_' + hashlib.sha1(statement.encode()).hexdigest()[:20]
+    arguments = ', '.join(f'%({param})s' for param in names)
+    return name, names, body, f'EXECUTE {name}({arguments})' if names else f'EXECUTE {name}'
+
+
+def parameter_types(context, names):
+    """PostgreSQL types of the parameters, unknown (inferred by PREPARE) when SQLAlchemy has none."""
+    binds = context.compiled.binds
+    types = []
+    for name in names:
+        bind = binds.get(name)
+        if bind is None or bind.type._isnull:
+            types.append('unknown')
+        else:
+            types.append(bind.type.compile(dialect=context.dialect))
+    return types
+
+
+def prepare(conn, cursor, statement, context):
+    """PREPARE the statement on the connection, False if PostgreSQL refuses it.
+
+    In a transaction the PREPARE runs in a savepoint, so that a failure leaves the transaction usable.
+    """
+    name, names, body, _ = rewrite(statement)
+    types = f' ({", ".join(parameter_types(context, names))})' if names else ''
+    savepoint = not cursor.connection.autocommit
+    if savepoint:
+        cursor.execute('SAVEPOINT statements_prepare')
+    try:
+        cursor.execute(f'PREPARE {name}{types} AS {body}')
+    except Exception:
+        if savepoint:
+            cursor.execute('ROLLBACK TO SAVEPOINT statements_prepare')
+        return False
+    finally:
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT statements_prepare')
+    return True
+
+
+def use_prepared(conn, cursor, statement, parameters, context, executemany):
+    # Server-side cursors (yield_per) need a DECLARE ... CURSOR FOR SELECT, not EXECUTE
+    if (executemany or context.compiled is None or getattr(cursor, 'name', None)
+            or not isinstance(parameters, dict) or not statement.lstrip().upper().startswith(('SELECT', 'WITH'))):
+        return statement, parameters
+    prepared = conn.info.get('prepared')
+    if prepared is None:
+        # statement -> True if prepared, False if PREPARE failed; kept with the DBAPI connection
+        prepared = conn.info['prepared'] = OrderedDict()
+    state = prepared.get(statement)
+    if state is None:
+        while len(prepared) >= PREPARED_PER_CONNECTION:
+            oldest, was_prepared = prepared.popitem(last=False)
+            if was_prepared:
+                cursor.execute(f'DEALLOCATE {rewrite(oldest)[0]}')
+        state = prepared[statement] = prepare(conn, cursor, statement, context)
+        with stats_lock:
+            stats['prepared' if state else 'refused'] += 1
+    else:
+        prepared.move_to_end(statement)
+    if not state:
+        return statement, parameters
+    with stats_lock:
+        stats['executed'] += 1
+    return rewrite(statement)[3], parameters
+
+
+def install(engine, prepared=False):
+    """Count the compiled cache outcomes of the engine, and with `prepared` run its SELECTs as prepared statements."""
+    engine = getattr(engine, 'sync_engine', engine)
+    if engine in _engines:
+        return
+    _engines.add(engine)
+    event.listen(engine, 'before_cursor_execute', count_execution)
+    if prepared:
+        if engine.dialect.name != 'postgresql' or engine.dialect.driver != 'psycopg2':
+            raise ValueError(f'Prepared statements need postgresql+psycopg2, not {engine.url.drivername}')
+        event.listen(engine, 'before_cursor_execute', use_prepared, retval=True)
+
+
+def cache_stats(engine):
+    """The counters, with the size and the capacity of the compiled cache of the engine."""
+    engine = getattr(engine, 'sync_engine', engine)
+    cache = engine._compiled_cache
+    with stats_lock:
+        result = dict(stats)
+    result['cache_size'] = len(cache) if cache is not None else 0
+    result['cache_capacity'] = cache.capacity if cache is not None else 0
+    return result
+
+
+def format_stats(engine, top=5):
+    """Lines of the cache statistics, with the most executed statements compiled on every call."""
+    result = cache_stats(engine)
+    compiled = result['hits'] + result['misses'] + result['no_key'] + result['disabled']
+    rate = result['hits'] / compiled * 100 if compiled else 0
+    lines = [f'compiled cache: {result["hits"]} hits, {result["misses"]} misses, '
+             f'{result["no_key"] + result["disabled"]} uncached, {result["raw"]} raw ({rate:.1f}% hits), '
+             f'{result["cache_size"]}/{result["cache_capacity"]} entries']
+    if result['prepared'] or result['refused'] or result['executed']:
+        lines.append(f'prepared statements: {result["prepared"]} prepared, {result["refused"]} refused by PREPARE, '
+                     f'{result["executed"]} executions')
+    with stats_lock:
+        statements = uncached.most_common(top)
+    for statement, calls in statements:
+        statement = ' '.join(statement.split())
+        lines.append(f'    uncached x{calls}: {statement[:100]}{"..." if len(statement) > 100 else ""}')
+    return lines
+
+
+def reset():
+    with stats_lock:
+        for key in stats:
+            stats[key] = 0
+        uncached.clear()
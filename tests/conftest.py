@@ -0,0 +1,19 @@
+import pytest
+
+import cache
+from conf import db
+
+
+@pytest.fixture(scope='session')
+def seeded_db(tmp_path_factory):
+    """A SQLite database with the 1k dataset of benchmarks/suite.py, for the reports and their references."""
+    from benchmarks.suite import reset_tables, seed
+
+    path = tmp_path_factory.mktemp('db') / 'test.sqlite'
+    db.config['TEST_DB'] = {'URL': f'sqlite:///{path}'}
+    db.set_profile('TEST_DB')
+    cache.backend = None
+    reset_tables()
+    seed('1k', 0, 1000, 0)
+    yield db.session
+    db.remove_session()
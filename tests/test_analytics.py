@@ -0,0 +1,22 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from analytics import Snapshot, check, positions  # noqa: E402
+
+
+def test_positions_of_missing_ids():
+    ids = np.array([1, 3, 5], dtype=np.int64)
+
+    assert positions(ids, [5, 1, 3]).tolist() == [2, 0, 1]
+    with pytest.raises(ValueError):
+        positions(ids, [1, 4])
+    with pytest.raises(ValueError):
+        positions(ids, [6])
+
+
+def test_reports_match_sql(seeded_db):
+    snapshot = Snapshot.from_database()
+
+    assert len(snapshot.scores['id']) == 1000
+    assert check(snapshot, limit=5) == 0
@@ -0,0 +1,29 @@
+import io
+
+from batch import read_operations
+
+
+def test_bad_lines_do_not_stop_the_batch():
+    stream = io.StringIO('{"action": "create", "model": "Group", "name": "G1"}\n'
+                         'not json\n'
+                         '\n'
+                         '[1, 2]\n'
+                         '{"action": "create", "model": "Group", "name": "G2"}\n'
+                         '{"action": "update", "model": "Group", "index": "x"}\n')
+    results = list(read_operations(stream))
+
+    assert [number for number, _ in results] == [1, 2, 4, 5, 6]
+    assert results[0][1].name == 'G1'
+    assert results[1][1].startswith('Cannot parse')
+    assert results[2][1] == 'Bad value: expected an object, not list'
+    assert results[3][1].name == 'G2'
+    assert results[4][1].startswith('Bad value')
+
+
+def test_csv_line_numbers():
+    stream = io.StringIO('\naction,model,name,index\ncreate,Group,G1,\n\nupdate,Group,G2,x\n')
+    results = list(read_operations(stream))
+
+    assert [number for number, _ in results] == [3, 5]
+    assert results[0][1].name == 'G1'
+    assert results[1][1].startswith('Bad value')
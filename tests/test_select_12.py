@@ -0,0 +1,38 @@
+import datetime
+import itertools
+from collections import Counter
+
+from sqlalchemy import select
+
+from benchmarks.select_12 import expected
+from conf.models import Student, Group, Score, Subject
+from my_select import select_12
+from seeds.init import SCORES_UNTIL
+
+
+def test_latest_scores_match_reference(seeded_db):
+    session = seeded_db
+    groups = session.scalars(select(Group.name).distinct()).all()
+    subjects = session.scalars(select(Subject.name).distinct()).all()
+
+    for group, subject in itertools.product(groups, subjects):
+        assert Counter(select_12(group, subject)) == Counter(expected(group, subject)), (group, subject)
+
+
+def test_last_entered_score_of_a_day_wins(seeded_db):
+    session = seeded_db
+    student = session.scalars(select(Student).order_by(Student.id).limit(1)).one()
+    subject = session.scalars(select(Subject).order_by(Subject.id).limit(1)).one()
+    group = session.get(Group, student.group_id).name
+    day = SCORES_UNTIL + datetime.timedelta(days=1)
+    session.add_all([Score(score=5.0, date=day, student_id=student.id, subject_id=subject.id),
+                     Score(score=1.0, date=day, student_id=student.id, subject_id=subject.id),
+                     Score(score=3.0, date=day - datetime.timedelta(days=1),
+                           student_id=student.id, subject_id=subject.id)])
+    session.flush()
+    try:
+        result = select_12(group, subject.name)
+        assert Counter(result) == Counter(expected(group, subject.name))
+        assert [score for score, fullname in result if fullname == student.fullname] == [1.0]
+    finally:
+        session.rollback()